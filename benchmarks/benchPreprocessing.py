@@ -0,0 +1,25 @@
+# Benchmark of the preprocessing pipeline: startup (import) cost, time per
+# phase and number of DGAL solves.
+# usage: python benchmarks/benchPreprocessing.py --project-dir <path> [--alpha-entries <n>]
+import sys
+import time
+from pathlib import Path
+
+# Get the PRAXIS DGMS root directory
+project_root = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(project_root))  # add repo root to Python path
+
+start = time.perf_counter()
+from lib.optiguide_lib.mainPreprocessing import get_project_dir, runPreprocessing
+importTime = time.perf_counter() - start
+
+settings = {}
+if "--alpha-entries" in sys.argv:
+    settings["alpha_entries"] = int(sys.argv[sys.argv.index("--alpha-entries") + 1])
+
+result = runPreprocessing(get_project_dir(), settings)
+
+print("import: %.3f s" % importTime)
+for phase, seconds in result["timings"].items():
+    print("%s: %.3f s" % (phase, seconds))
+print("solves: %d" % result["solves"])
@@ -1,41 +1,87 @@
 '''
 extentions TBD:
 ---------------
-1. additional Pyomo dvar types (not just real? and int?); also add optional lower and upper bounds for each declared var
-2. if Pyomo constraintSeq evaluates to True, make sure that the empty seq is traversed to Pyomo;
-   if evaluates to False, return dgalStatus within status of optAnswer
-3. add dvar arrays, so that they can be specified in a compact way in var input
+1. additional Pyomo dvar types (not just real? and int?; bounds and domain hints are supported, see declaredBounds)
+2. constant constraintSeqs (True or False) are supported, see constantConstraints
+3. dvar arrays can be specified in a compact way in var input (see varBlockSets)
 4. Add piece-wise linear function in Python to be translated into Pyomo piece-wise linear function
 
 
 
 '''
 import pdb
+import builtins
+import io
 import copy
+import math
 import json
+import time
+import pickle
+import hashlib
+import inspect
+from pathlib import Path
+import numpy as np
 import pyomo.environ as pyo
 from pyomo.environ import *
 from pyomo.opt import SolverFactory
 from pyomo.opt import SolverStatus, TerminationCondition
+from pyomo.solvers.plugins.solvers.persistent_solver import PersistentSolver
+from pyomo.solvers.plugins.solvers.direct_or_persistent_solver import DirectOrPersistentSolver
 
+import os
 import logging
-logging.basicConfig(filename= "dgalDebug.log", level=logging.DEBUG)
+import logging.handlers
+from pyomo.common.tee import capture_output
 #--------------------------------------------------------------------------
+# tracing: DGAL and vThings messages go to the "dgal" and "vThings" loggers,
+# and are off by default. They are formatted lazily, i.e., only if their level
+# is enabled, so that the (possibly large) models and values they show cost
+# nothing otherwise. startTrace sends them to rotating files, at levels:
+#   INFO:  solves, and, if solverLog, the solver log of each solve
+#   DEBUG: also the AM inputs and outputs, solutions and Pyomo model dumps
+logger = logging.getLogger("dgal")
+traceLoggers = ["dgal", "vThings"]
+tracing = {"handler": None, "solverLog": False}
+
+# perProcess: a file per process, e.g., for the workers of a parallel sweep
+def startTrace(path="dgalTrace.log", level="DEBUG", solverLog=False,
+               maxBytes=10*2**20, backupCount=3, perProcess=False):
+    stopTrace()
+    if perProcess:
+        path = path + "." + str(os.getpid())
+    handler = logging.handlers.RotatingFileHandler(path, maxBytes=maxBytes,
+                                                   backupCount=backupCount)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(levelname)s: %(message)s"))
+    for name in traceLoggers:
+        logging.getLogger(name).setLevel(level)
+        logging.getLogger(name).addHandler(handler)
+    tracing["handler"] = handler
+    tracing["solverLog"] = solverLog
+
+def stopTrace():
+    if tracing["handler"] is not None:
+        for name in traceLoggers:
+            logging.getLogger(name).removeHandler(tracing["handler"])
+            logging.getLogger(name).setLevel(logging.NOTSET)
+        tracing["handler"].close()
+    tracing["handler"] = None
+    tracing["solverLog"] = False
+
 def startDebug():
-    f = open("debug.log","w")
-    f.write("\nNEW RUN \n--------\n")
+    startTrace("debug.log")
 
 def debug(mssg,var):
-    f = open("debug.log","a")
-    f.write("\n\nDEBUG: ")
-    f.write(str(mssg))
-    f.write(":\n")
-    f.write(str(var))
-#---------------------------------------------------------------------------
-'''
-def debug(mssg,var):
-    pass
-'''
+    logger.debug("%s:\n%s", mssg, var)
+
+# the Pyomo model dump of pprint, if DEBUG is enabled
+def traceModel(mssg,pyomoModel):
+    if logger.isEnabledFor(logging.DEBUG):
+        stream = io.StringIO()
+        pyomoModel.pprint(ostream=stream)
+        logger.debug("%s:\n%s", mssg, stream.getvalue())
+#--------------------------------------------------------------------------
+# run statistics, e.g., for benchmarking the number of solver invocations
+stats = {"solves": 0}
 #--------------------------------------------------------------------------
 
 def merge(dictSeq):
@@ -92,47 +138,238 @@ def dgalType(input):
     else:
         return "none"
 #--------------------------------------------------------------------------
-# initially invoked with counts = {"int?": -1, "real?": -1}
-def enumDgalVars(input, counts):
-    dgalVarFlag = dgalType(input)
-    if dgalVarFlag == "real?":
-            counts["real?"] += 1
-            input["index"] = counts["real?"]
-    elif dgalVarFlag == "int?":
-            counts["int?"] += 1
-            input["index"] = counts["int?"]
-    elif type(input) == dict:
-        for key in input:
-            enumDgalVars(input[key],counts)
-    elif type(input) == list or type(input) == set:
-        for obj in input:
-            enumDgalVars(obj,counts)
-#-------------------------------------------------------------------------------------------------
-#    -- assumes that pyomoModel has two var arrays: real[] and int[] with the numbers corresponding to counts;
-#    -- assumes that counts capture the top index for "real?" and "int?" arrays
-#    -- traverse input and replace dgalVarTypes with pyomo model variables
-#    -- pyomo model should have sufficient length of real and int variable arrays to be assigned
-#    -- to dgalType vars
-
-def putPyomoVars(input, pyomoModel):
-    dgalVar = dgalType(input)
-    if dgalVar == "real?":
-        return pyomoModel.real[input["index"]]
-    if dgalVar == "int?":
-        return pyomoModel.int[input["index"]]
-    if type(input) == dict:    #i.e., dict that is not dgalTypes
-        for key in input:
-            input[key] = putPyomoVars(input[key], pyomoModel)
-        return input
-    if type(input) == list:
-        for i in range(len(input)):
-            input[i] = putPyomoVars(input[i], pyomoModel)
-        return input
-    return input    #can't contain dgalTypes
+# Flat var index of an input: the input is traversed once, and each dgalVar
+# gets a slot in the Pyomo var array of its type (real or int), in depth-first
+# order, and its declared bounds (see declaredBounds). A var block (see
+# varBlockSets) gets a contiguous slice of the var array, in row-major order.
+# The input itself is the shared template of the var index: inputs with
+# Pyomo vars, and solutions, are made by scattering values along the var paths
+# (see scatterVarValues), without copying or traversing the rest of the input.
+#- counts: the top slots of the "real?" and "int?" arrays, initially
+#          {"real?": -1, "int?": -1}; updated, so that several inputs can share
+#          the same var arrays
+# returns {"input": input, "paths": [path of each var, a tuple of keys and indices],
+#          "isInt": bool array, "slots": int array (first slot of a block),
+#          "sizes": int array (1 for a single var), "blocks": {position in
+#          paths: index sets of the block}, "lb": array, "ub": array, "counts": counts}
+def varIndex(input, counts=None):
+    if counts is None:
+        counts = {"real?": -1, "int?": -1}
+    paths = []
+    types = []
+    slots = []
+    sizes = []
+    blocks = dict()
+    bounds = []
+    def enumVars(obj, path):
+        varType = dgalType(obj)
+        if varType == "real?" or varType == "int?":
+            sets = varBlockSets(obj)
+            size = 1
+            if sets is not None:
+                blocks[len(paths)] = sets
+                size = math.prod([len(keys) for keys in sets])
+            paths.append(path)
+            types.append(varType == "int?")
+            slots.append(counts[varType] + 1)
+            sizes.append(size)
+            counts[varType] += size
+            bounds.append(declaredBounds(obj))
+        elif type(obj) == dict:
+            for key in obj:
+                enumVars(obj[key], path + (key,))
+        elif type(obj) == list:
+            for i in range(len(obj)):
+                enumVars(obj[i], path + (i,))
+    enumVars(input, ())
+    return {
+        "input": input,
+        "paths": paths,
+        "isInt": np.array(types, dtype=bool),
+        "slots": np.array(slots, dtype=int),
+        "sizes": np.array(sizes, dtype=int),
+        "blocks": blocks,
+        "lb": np.array([lb for (lb, ub) in bounds], dtype=float),
+        "ub": np.array([ub for (lb, ub) in bounds], dtype=float),
+        "counts": counts
+    }
+
+# Bounds (lb, ub) of a dgalVar declaration, e.g., {"dgalType": "int?", "lb": 0,
+# "ub": 60}, narrowed by its optional "domain" hint: "nonNegative", "nonPositive"
+# or "binary" (i.e., an int? in [0, 1]); -inf and inf if unbounded
+domainBounds = {
+    "nonNegative": (0, math.inf),
+    "nonPositive": (-math.inf, 0),
+    "binary": (0, 1)
+}
+
+def declaredBounds(var):
+    lb = var.get("lb", -math.inf)
+    ub = var.get("ub", math.inf)
+    if "domain" in var:
+        if var["domain"] not in domainBounds:
+            raise Exception("dgal: unknown domain of " + var["dgalType"] + " var: " + str(var["domain"]))
+        lb = builtins.max(lb, domainBounds[var["domain"]][0])
+        ub = builtins.min(ub, domainBounds[var["domain"]][1])
+    return (lb, ub)
+
+# Var blocks: a compact declaration of an array of vars of the same type and
+# bounds, e.g., {"dgalType": "int?", "indexSets": [["supplier1", "supplier2"],
+# ["chair", "table"]], "lb": 0}, which the AM sees as nested dicts of vars,
+# qty[supplier][item]. An index set is a list of keys (of a dict), or a number
+# n (of a list of length n). Solutions have the same nested structure.
+# returns the index sets of var, as lists of keys or ranges, or None if var is
+# a single var
+def varBlockSets(var):
+    if "indexSets" not in var:
+        return None
+    sets = []
+    for keys in var["indexSets"]:
+        if type(keys) == int:
+            sets.append(range(keys))
+        elif type(keys) == list:
+            sets.append(keys)
+        else:
+            raise Exception("dgal: index set of a var block is neither a list nor a number: " + str(keys))
+    return sets
+
+# nested dicts (or lists, for ranges) over the index sets of a block, of the
+# values of the block, in row-major order from start
+def blockValues(sets, values, start=0):
+    if len(sets) == 0:
+        return values[start]
+    stride = math.prod([len(keys) for keys in sets[1:]])
+    if type(sets[0]) == range:
+        return [blockValues(sets[1:], values, start + k * stride) for k in sets[0]]
+    return {key: blockValues(sets[1:], values, start + k * stride) for k, key in enumerate(sets[0])}
+
+# value of each entry of index (a single var, or the nested values of a block),
+# from the values of the real and int var arrays, e.g., Pyomo vars or numbers
+def entryValues(index, realValues, intValues):
+    values = []
+    for k, (isInt, slot, size) in enumerate(zip(index["isInt"].tolist(), index["slots"].tolist(),
+                                                index["sizes"].tolist())):
+        array = intValues if isInt else realValues
+        if k in index["blocks"]:
+            values.append(blockValues(index["blocks"][k], [array[j] for j in range(slot, slot + size)]))
+        else:
+            values.append(array[slot])
+    return values
+
+# set the declared bounds of the vars of index on their Pyomo vars
+def putVarBounds(index, pyomoModel):
+    for isInt, slot, size, lb, ub in zip(index["isInt"].tolist(), index["slots"].tolist(), index["sizes"].tolist(),
+                                         index["lb"].tolist(), index["ub"].tolist()):
+        for j in range(slot, slot + size):
+            v = pyomoModel.int[j] if isInt else pyomoModel.real[j]
+            if lb > -math.inf:
+                v.setlb(lb)
+            if ub < math.inf:
+                v.setub(ub)
+
+# Simple bounds: the active constraints of pyomoModel on a single var, linear
+# with constant coefficients (e.g., qty >= 0 or qty <= available of an AM), are
+# pushed down into the bounds of the var, and deactivated, so that the solver
+# gets a smaller constraint matrix. Constraints with mutable params (e.g., of
+# compiled models) are kept, since their bounds change with the params.
+# Vars whose bounds are equal are then fixed (decided), and a model with
+# contradicting bounds is marked infeasible (see trivialStatus)
+def pushSimpleBounds(pyomoModel):
+    from pyomo.repn import generate_standard_repn
+    from pyomo.core.expr.visitor import identify_variables, identify_mutable_parameters
+    for c in pyomoModel.component_data_objects(Constraint, active=True):
+        if c.equality or len(list(identify_variables(c.body))) != 1:
+            continue
+        if next(identify_mutable_parameters(c.expr), None) is not None:
+            continue
+        repn = generate_standard_repn(c.body)
+        if not repn.is_linear() or len(repn.linear_vars) != 1 or repn.linear_coefs[0] == 0:
+            continue
+        v = repn.linear_vars[0]
+        coef = repn.linear_coefs[0]
+        lower = None if c.lower is None else (pyo.value(c.lower) - repn.constant) / coef
+        upper = None if c.upper is None else (pyo.value(c.upper) - repn.constant) / coef
+        if coef < 0:
+            lower, upper = upper, lower
+        if v.is_integer():
+            # integral bounds, within a tolerance of the coefficient division
+            lower = None if lower is None else math.ceil(lower - 1e-9)
+            upper = None if upper is None else math.floor(upper + 1e-9)
+        lb = v.lb if lower is None else (lower if v.lb is None else builtins.max(v.lb, lower))
+        ub = v.ub if upper is None else (upper if v.ub is None else builtins.min(v.ub, upper))
+        v.setlb(lb)
+        v.setub(ub)
+        c.deactivate()
+    for v in pyomoModel.component_data_objects(Var):
+        if v.lb is None or v.ub is None or v.fixed:
+            continue
+        if v.lb > v.ub:
+            pyomoModel.dgalInfeasible = True
+        elif v.lb == v.ub:
+            v.fix(v.lb)
+
+# copy of the input of index, with its vars replaced by values (one per var, in
+# index order); only the dicts and lists on the var paths are copied, the rest
+# is shared with the input
+def scatterVarValues(index, values):
+    if index["paths"] == [()]:
+        return values[0]    # the input is a single var
+    root = copy.copy(index["input"])
+    copied = {(): root}
+    for path, value in zip(index["paths"], values):
+        node = root
+        for depth in range(1, len(path)):
+            child = copied.get(path[:depth])
+            if child is None:
+                child = copy.copy(node[path[depth-1]])
+                node[path[depth-1]] = child
+                copied[path[:depth]] = child
+            node = child
+        node[path[-1]] = value
+    return root
+
+# values of a block (nested as by blockValues) in row-major order
+def blockFlatValues(sets, values):
+    if len(sets) == 0:
+        return [values]
+    return [v for key in sets[0] for v in blockFlatValues(sets[1:], values[key])]
+
+# values of the real and int var arrays of index, read from a solution of index
+# (e.g., of varSolution), i.e., the inverse of scatterVarValues(index, entryValues(...));
+# a flat encoding of the solution, against the input of index as its template
+def gatherVarValues(index, solution):
+    real = [None] * (index["counts"]["real?"] + 1)
+    ints = [None] * (index["counts"]["int?"] + 1)
+    for k, (path, isInt, slot) in enumerate(zip(index["paths"], index["isInt"].tolist(),
+                                                index["slots"].tolist())):
+        value = solution
+        for key in path:
+            value = value[key]
+        array = ints if isInt else real
+        if k in index["blocks"]:
+            values = blockFlatValues(index["blocks"][k], value)
+            array[slot:slot + len(values)] = values
+        else:
+            array[slot] = value
+    return {"real?": real, "int?": ints}
+
+# input of index with its vars replaced by the vars of pyomoModel, which has
+# the two var arrays real and int, of at least the sizes of index["counts"]
+def putPyomoVars(index, pyomoModel):
+    return scatterVarValues(index, entryValues(index, pyomoModel.real, pyomoModel.int))
+
+# constraint list of a dgalBoolean (see all), which may be constant: True is
+# no constraint, and False an infeasible model, which is marked so that it is
+# not sent to the solver (see trivialStatus)
+def constantConstraints(pyomoModel, constraintList):
+    pyomoModel.dgalInfeasible = constraintList is False
+    if type(constraintList) == bool:
+        return []
+    return constraintList
 
 #-------------------------------------------------------------------------------
 #- dgModel: an analytic performance model (AM) a python function
-#- enumInput: is a dgalVar enumerated dgModel input
+#- index: is the var index of the dgModel input (see varIndex)
 #- objective: is a function that gives value to optimize from output of dgModel
 #- minMax: is either "min" or "max" to indicate whether the problem is minimization or
 #          maximization of objective
@@ -140,10 +377,12 @@ def putPyomoVars(input, pyomoModel):
 #             this is going to serve as constraints of the optimization problem
 #- config: is a structure with solver / algorithm configuration: for now it
 #           is a dict {"solver": solver }, where solver is an available Pyomo solver
-def createPyomoModel(dgalModel, enumInputAndCounts, minMax, objective, constraints):
-# extract enumInput & counts
-    enumInput = enumInputAndCounts["enumInput"]
-    counts = enumInputAndCounts["counts"]
+#- params: optional dict {paramName: initialValue}; when given, the model gets a
+#          mutable Pyomo param per name, and objective is invoked as
+#          objective(output, params) with params mapping names to those Pyomo params
+def createPyomoModel(dgalModel, index, minMax, objective, constraints, params=None):
+# extract counts
+    counts = index["counts"]
 # create Pyomo model and vars
     model = ConcreteModel()
     model.realI = RangeSet(0,counts["real?"])
@@ -152,17 +391,24 @@ def createPyomoModel(dgalModel, enumInputAndCounts, minMax, objective, constrain
 #    model.int = Var(model.intI, domain=NonNegativeIntegers)
     model.real = Var(model.realI, domain=Reals)
     model.int = Var(model.intI, domain=Integers)
+    putVarBounds(index,model)
 # insert pyomoVars
-    inputWithPyomoVars = copy.deepcopy(enumInput)
-    putPyomoVars(inputWithPyomoVars,model)
+    inputWithPyomoVars = putPyomoVars(index,model)
     debug("input w Pyomo vars",inputWithPyomoVars)
 #    logging.debug("\n input w Pyomo vars: \n",inputWithPyomoVars)
 
 # run dgModel (AM) on inputWithPyomoVars to get symbolic output
     output = dgalModel(inputWithPyomoVars)
     debug("output of dgalModel", output)
-    constraintList = constraints(output)
-    obj = objective(output)
+    # the traced output, evaluated at the optimum (see outputValue)
+    model.dgalOutput = output
+    constraintList = constantConstraints(model, constraints(output))
+    if params is None:
+        obj = objective(output)
+    else:
+        model.paramI = Set(initialize=list(params.keys()))
+        model.dgalParam = Param(model.paramI, mutable=True, initialize=params)
+        obj = objective(output, {p: model.dgalParam[p] for p in params})
 
 # insert constaints and objective into Pyomo Model
     model.dgalConstraintList = constraintList
@@ -173,11 +419,13 @@ def createPyomoModel(dgalModel, enumInputAndCounts, minMax, objective, constrain
     def pyomoObjectiveRule(model):
         return(model.dgalObjective)
     model.pyomoConstraint = Constraint(model.constrIndex, rule= pyomoConstraintRule)
+    pushSimpleBounds(model)
     if minMax == "min":
         model.pyomoObjective = Objective(rule=pyomoObjectiveRule, sense=minimize)
     elif minMax == "max":
         model.pyomoObjective = Objective(rule=pyomoObjectiveRule, sense=maximize)
-    else: debug("dgal: minMax flag error")
+    else:
+        raise Exception("dgal: minMax flag error: " + str(minMax))
     debug("pyomoModel before return",model)
     return model
 #------------------------------------------------------------------------------
@@ -187,61 +435,555 @@ def createPyomoModel(dgalModel, enumInputAndCounts, minMax, objective, constrain
 # will need auxiliary functions of extracting param vector from input, and constructing
 # varInput from varParamInput + param vector
 
-def compileDgalModel(dgalModel, varParamInputAndCounts, minMax, objective, constraints):
-    skip
+# numeric leaves of input (other than dgalVars and bools) are the input params
+def isParam(input):
+    return isinstance(input, (int, float)) and not isinstance(input, bool)
+
+# param vector of input, i.e., the values of its numeric leaves in
+# depth-first traversal order
+def paramVector(input, vector=None):
+    if vector is None:
+        vector = []
+    if dgalType(input) != "none":
+        return vector
+    if isParam(input):
+        vector.append(input)
+    elif type(input) == dict:
+        for key in input:
+            paramVector(input[key], vector)
+    elif type(input) == list:
+        for obj in input:
+            paramVector(obj, vector)
+    return vector
+
+# shape of input: its structure with params and dgalVars replaced by their types
+# (and declared bounds, if any); two inputs of the same shape differ only in param values
+def inputShape(input):
+    if dgalType(input) != "none":
+        if builtins.any(key in input for key in ["lb", "ub", "domain", "indexSets"]):
+            return {key: input[key] for key in ["dgalType", "lb", "ub", "domain", "indexSets"] if key in input}
+        return input["dgalType"]
+    if isParam(input):
+        return "param"
+    if type(input) == dict:
+        return {key: inputShape(input[key]) for key in input}
+    if type(input) == list:
+        return [inputShape(obj) for obj in input]
+    return input
+
+# copy of input (traversed in the same order as paramVector) with its params
+# replaced by the pyomo model params; counter is a one element list
+def putPyomoParams(input, pyomoModel, counter):
+    if isParam(input):
+        counter[0] += 1
+        return pyomoModel.inputParam[counter[0]]
+    if type(input) == dict and dgalType(input) == "none":
+        return {key: putPyomoParams(input[key], pyomoModel, counter) for key in input}
+    if type(input) == list:
+        return [putPyomoParams(obj, pyomoModel, counter) for obj in input]
+    return input
+
+# fingerprint of a python function: its source and the source of its module,
+# and recursively the functions and values it refers to through its closure
+# and module globals (data values by repr, so that a module-level constant
+# changed at run time changes the fingerprint)
+def functionFingerprint(f, seen=None):
+    if seen is None:
+        seen = set()
+    if id(f) in seen:
+        return ""
+    seen.add(id(f))
+    try:
+        fingerprint = inspect.getsource(f)
+    except (OSError, TypeError):
+        return getattr(f, "__qualname__", repr(f))
+    module = inspect.getmodule(f)
+    if module is not None and id(module) not in seen:
+        seen.add(id(module))
+        try:
+            fingerprint += inspect.getsource(module)
+        except (OSError, TypeError):
+            pass
+    code = getattr(f, "__code__", None)
+    if code is None:
+        return fingerprint
+    for cell in (f.__closure__ or ()):
+        try:
+            v = cell.cell_contents
+        except ValueError:
+            continue
+        if inspect.isfunction(v):
+            fingerprint += functionFingerprint(v, seen)
+        else:
+            fingerprint += repr(v)
+    for name in code.co_names:
+        if name not in f.__globals__:
+            continue
+        v = f.__globals__[name]
+        if inspect.isfunction(v):
+            fingerprint += functionFingerprint(v, seen)
+        elif isinstance(v, (int, float, str, bool, list, tuple, dict, set, frozenset, type(None))):
+            fingerprint += name + "=" + repr(v)
+    return fingerprint
+
+# key of a compiled model: hash of the AM source, objective, constraints,
+# minMax and the shape of the input
+def compiledModelKey(dgalModel, input, minMax, objective, constraints):
+    try:
+        amSource = inspect.getsource(inspect.getmodule(dgalModel))
+    except (OSError, TypeError):
+        amSource = ""
+    key = hashlib.sha256()
+    for part in [amSource, functionFingerprint(dgalModel), functionFingerprint(objective),
+                 functionFingerprint(constraints), minMax, json.dumps(inputShape(input))]:
+        key.update(part.encode())
+    return key.hexdigest()
+
+# compiled models cached in memory by compiledModelKey
+compiledModels = dict()
+
+# compiles dgalModel, with the params of varParamInput as mutable Pyomo params.
+# The AM is traced only once; the compiled model can be instantiated with any
+# input of the same shape (see optimizeCompiled), without re-running the AM or
+# rebuilding Pyomo expressions. Note that the AM must not branch on param values.
+# The compiled model is cached in memory and, if cacheDir is given, on disk
+#- index: the var index of the varParamInput, as in createPyomoModel
+# returns {"key": key, "pyomoModel": pyomoModel, "shape": inputShape}
+def compileDgalModel(dgalModel, index, minMax, objective, constraints, cacheDir=None):
+    input = index["input"]
+    counts = index["counts"]
+    key = compiledModelKey(dgalModel, input, minMax, objective, constraints)
+    if key in compiledModels:
+        return compiledModels[key]
+    cacheFile = None
+    if cacheDir is not None:
+        cacheFile = Path(cacheDir) / ("dgalCompiled_" + key + ".pkl")
+        if cacheFile.exists():
+            with open(cacheFile, "rb") as f:
+                compiledModels[key] = pickle.load(f)
+            return compiledModels[key]
+# create Pyomo model, vars and params
+    params = paramVector(input)
+    model = ConcreteModel()
+    model.realI = RangeSet(0,counts["real?"])
+    model.intI = RangeSet(0,counts["int?"])
+    model.real = Var(model.realI, domain=Reals)
+    model.int = Var(model.intI, domain=Integers)
+    putVarBounds(index,model)
+    model.inputParamI = RangeSet(0,len(params)-1)
+    model.inputParam = Param(model.inputParamI, mutable=True, initialize=dict(enumerate(params)))
+# insert pyomoVars and pyomoParams, and trace dgalModel (AM)
+    inputWithPyomoVars = putPyomoParams(putPyomoVars(index,model),model,[-1])
+    output = dgalModel(inputWithPyomoVars)
+    model.dgalOutput = output
+    constraintList = constantConstraints(model, constraints(output))
+    obj = objective(output)
+# insert constraints and objective; no rules, so that the model can be pickled
+    model.pyomoConstraint = ConstraintList()
+    for c in constraintList:
+        model.pyomoConstraint.add(c)
+    pushSimpleBounds(model)
+    if minMax == "min":
+        model.pyomoObjective = Objective(expr=obj, sense=minimize)
+    elif minMax == "max":
+        model.pyomoObjective = Objective(expr=obj, sense=maximize)
+    else:
+        raise Exception("dgal: minMax flag error: " + str(minMax))
+    compiled = {"key": key, "pyomoModel": model, "shape": inputShape(input)}
+    compiledModels[key] = compiled
+    if cacheFile is not None:
+        cacheFile.parent.mkdir(parents=True, exist_ok=True)
+        with open(cacheFile, "wb") as f:
+            pickle.dump(compiled, f)
+    return compiled
+
+# binds the params of input into compiledModel; input must have the shape
+# the model was compiled for
+def instantiateCompiledModel(compiledModel, input):
+    if inputShape(input) != compiledModel["shape"]:
+        raise Exception("dgal: input shape differs from the compiled model shape")
+    pyomoModel = compiledModel["pyomoModel"]
+    for i, v in enumerate(paramVector(input)):
+        pyomoModel.inputParam[i] = v
+    return pyomoModel
 
 #------------------------------------------------------------------------------
-# pyomoResult is the result of optimizaiton from Pyomo Solver (in JSON)
-# dgalType is either "real?" or "int?"
-# index is a non-negative integer indicating position in pyomo var array
-# the function returns the value of the corresponding variable
-def varValue(pyomoModel,dgalType,index):
-    # tbd; in the meantime just mock-up
-#    debug("dgalType_in_varValue", dgalType)
-#    debug("index_in_varValue", index)
-    if dgalType == "real?":
-        value = pyo.value(pyomoModel.real[index])
-#        debug("real value",value)
-    elif dgalType == "int?":
-        value = pyo.value(pyomoModel.int[index])
-#        debug("int value",value)
+# values of the real and int var arrays of pyomoModel, read in bulk into arrays;
+# int values are rounded within the solver integrality tolerance (e.g., of
+# big-M models), and vars without a value are nan
+def varArrayValues(pyomoModel):
+    real = np.array([np.nan if v.value is None else v.value for v in pyomoModel.real.values()], dtype=float)
+    ints = np.array([np.nan if v.value is None else v.value for v in pyomoModel.int.values()], dtype=float)
+    # + 0.0, so that rounding a small negative value gives 0.0, not -0.0
+    return {"real?": real, "int?": np.round(ints) + 0.0}
+
+# solution of index: its input, with the vars replaced by their values in pyomoModel
+# (None for a var without a value, e.g., that is in no constraint)
+def varSolution(index, pyomoModel):
+    values = varArrayValues(pyomoModel)
+    real = [None if math.isnan(v) else v for v in values["real?"].tolist()]
+    ints = [None if math.isnan(v) else v for v in values["int?"].tolist()]
+    return scatterVarValues(index, entryValues(index, real, ints))
+
+#-----------------------------------------------------------------
+# evaluated results: the output of the AM and the objective at the optimum are
+# read from the values of the traced Pyomo expressions, so that callers do not
+# re-run the AM on the optimal input
+
+# round the int vars of pyomoModel to integers, within the solver integrality
+# tolerance (as varValue), so that the evaluated output is that of the solution
+def roundIntVars(pyomoModel):
+    for i in pyomoModel.intI:
+        v = pyomoModel.int[i]
+        if v.value is not None:
+            v.set_value(float(round(v.value)), skip_validation=True)
+
+# value of a traced output at the current values of the model vars: Pyomo
+# expressions, vars and params are evaluated to numbers, and a dgalBoolean,
+# i.e., a flat list of Pyomo constraints (see all), to a bool
+def outputValue(output):
+    if type(output) == dict:
+        return {key: outputValue(output[key]) for key in output}
+    if type(output) == list:
+        if len(output) > 0 and builtins.all(isConstraint(c) for c in output):
+            return builtins.all(pyo.value(c) for c in output)
+        return [outputValue(obj) for obj in output]
+    if type(output) == tuple:
+        return tuple(outputValue(obj) for obj in output)
+    if hasattr(output, "is_expression_type"):
+        return pyo.value(output)
+    return output
+
+def isConstraint(c):
+    from pyomo.core.expr import ExpressionType
+    return hasattr(c, "is_expression_type") and c.is_expression_type(ExpressionType.RELATIONAL)
+
+# {"output": evaluated output, "objective": objective value} of pyomoModel at
+# its current var values; the output is omitted if the model keeps none
+def evaluatedResult(pyomoModel):
+    result = {"objective": pyo.value(pyomoModel.pyomoObjective)}
+    if hasattr(pyomoModel, "dgalOutput"):
+        result["output"] = outputValue(pyomoModel.dgalOutput)
+    return result
+
+#-----------------------------------------------------------------
+# sparse-matrix backend, selected by options["solver"] == "scipy_milp":
+# the linear traced model is extracted into a SciPy sparse constraint matrix,
+# bounds, integrality flags and objective vector, and solved with
+# scipy.optimize.milp (HiGHS), without a Pyomo solver interface.
+
+# extract the linear form of pyomoModel:
+# {"columns": [pyomo vars], "A": sparse matrix, "lb": array, "ub": array,
+#  "c": array, "constant": number, "integrality": array, "bounds": (lb, ub)}
+# the constraint part is cached on the model, unless constraints depend on
+# input params (compiled models), since only objective params change otherwise
+def sparseForm(pyomoModel):
+    import numpy as np
+    from scipy.sparse import coo_matrix
+    from pyomo.repn import generate_standard_repn
+
+    form = getattr(pyomoModel, "dgalSparseForm", None)
+    if form is None:
+        columns = [pyomoModel.real[i] for i in pyomoModel.realI] + \
+                  [pyomoModel.int[i] for i in pyomoModel.intI]
+        # other vars, e.g., the selectors and values of a disjunctive model
+        dgalVarIds = set(id(v) for v in columns)
+        columns += [v for v in pyomoModel.component_data_objects(Var, descend_into=True)
+                    if id(v) not in dgalVarIds]
+        colIndex = {id(v): j for j, v in enumerate(columns)}
+        rows, cols, coefs, lbs, ubs = [], [], [], [], []
+        feasible = True
+        for c in pyomoModel.component_data_objects(Constraint, active=True):
+            repn = generate_standard_repn(c.body, compute_values=True)
+            if not repn.is_linear():
+                raise Exception("dgal: scipy_milp requires a linear model, got: " + str(c.expr))
+            lower = -np.inf if c.lower is None else pyo.value(c.lower) - repn.constant
+            upper = np.inf if c.upper is None else pyo.value(c.upper) - repn.constant
+            if len(repn.linear_vars) == 0:
+                # constraint without vars: either trivially true or infeasible
+                if lower > 1e-9 or upper < -1e-9:
+                    feasible = False
+                continue
+            row = len(lbs)
+            for v, coef in zip(repn.linear_vars, repn.linear_coefs):
+                rows.append(row)
+                cols.append(colIndex[id(v)])
+                coefs.append(coef)
+            lbs.append(lower)
+            ubs.append(upper)
+        form = {
+            "columns": columns,
+            "A": coo_matrix((coefs, (rows, cols)), shape=(len(lbs), len(columns))).tocsr(),
+            "lb": np.array(lbs),
+            "ub": np.array(ubs),
+            "integrality": np.array([1 if v.is_integer() else 0 for v in columns]),
+            "bounds": (np.array([-np.inf if v.lb is None else v.lb for v in columns]),
+                       np.array([np.inf if v.ub is None else v.ub for v in columns])),
+            "feasible": feasible
+        }
+        if not hasattr(pyomoModel, "inputParam"):
+            pyomoModel.dgalSparseForm = form
+    # objective
+    objective = pyomoModel.pyomoObjective
+    repn = generate_standard_repn(objective.expr, compute_values=True)
+    if not repn.is_linear():
+        raise Exception("dgal: scipy_milp requires a linear objective")
+    colIndex = {id(v): j for j, v in enumerate(form["columns"])}
+    c = np.zeros(len(form["columns"]))
+    for v, coef in zip(repn.linear_vars, repn.linear_coefs):
+        c[colIndex[id(v)]] += coef
+    return dict(form, c=c, constant=repn.constant, sense=objective.sense)
+
+# termination conditions of scipy.optimize.milp status codes
+milpTerminationConditions = {
+    0: "optimal",
+    1: "maxTimeLimit",
+    2: "infeasible",
+    3: "unbounded",
+    4: "error"
+}
+
+def solveSparseMilpConstructDgalResult(pyomoModel,index,options):
+    import numpy as np
+    from scipy.optimize import milp, LinearConstraint, Bounds
+
+    form = sparseForm(pyomoModel)
+    if not form["feasible"]:
+        dgalOutput = { "status": {"solver_status": "ok", "termination_condition": "infeasible"},
+                       "solution": "none"}
+        return dgalOutput
+    c = form["c"] if form["sense"] == minimize else -form["c"]
+    constraints = []
+    if form["A"].shape[0] > 0:
+        constraints.append(LinearConstraint(form["A"], form["lb"], form["ub"]))
+    cutoff = options.get("cutoff")
+    if cutoff is not None:
+        # the objective, in the sense of the model, is at least as good as cutoff
+        if form["sense"] == minimize:
+            constraints.append(LinearConstraint(form["c"], -np.inf, cutoff - form["constant"]))
+        else:
+            constraints.append(LinearConstraint(form["c"], cutoff - form["constant"], np.inf))
+    milpOptions = dict(options.get("milpOptions") or {})
+    if "timeLimit" in options:
+        milpOptions.setdefault("time_limit", options["timeLimit"])
+    res = milp(c, constraints=constraints, integrality=form["integrality"],
+               bounds=Bounds(*form["bounds"]), options=milpOptions)
+    status = {"solver_status": "ok" if res.status in (0, 1, 2, 3) else "not_ok",
+              "termination_condition": milpTerminationConditions.get(res.status, "error")}
+    if status["termination_condition"] == "optimal":
+        for v, x in zip(form["columns"], res.x):
+            v.set_value(float(round(x)) if v.is_integer() else x, skip_validation=True)
+        optAnswer = "none" if index is None else varSolution(index,pyomoModel)
+    else:
+        optAnswer = "none"
+    dgalOutput = { "status": status, "solution": optAnswer}
+    if status["termination_condition"] == "optimal":
+        dgalOutput.update(evaluatedResult(pyomoModel))
+    if "debug" in options and options["debug"]:
+        dgalOutput["report"] = {"status": res.status, "message": res.message,
+                                "objective": None if res.fun is None else
+                                    (res.fun if form["sense"] == minimize else -res.fun) + form["constant"]}
+    return dgalOutput
+
+#-----------------------------------------------------------------
+# solver session: keeps one solver instance across consecutive solves, to be
+# passed as options["session"]. With a persistent solver (e.g., gurobi_persistent
+# or an APPSI interface such as appsi_highs) the model stays loaded in the solver
+# between solves of the same (parametric) model, and the previous incumbent is
+# fed in as a MIP start when the solver is warm start capable.
+# session["solveTimes"] records the wall-clock time of each solve
+# (the scipy_milp backend has no solver instance to keep)
+def solverSession(solver):
+    return {
+        "solver": solver,
+        "opt": None if solver == "scipy_milp" else SolverFactory(solver),
+        "pyomoModel": None,
+        "incumbent": None,
+        "solveTimes": []
+    }
+
+# values of the real and int var arrays of pyomoModel
+def varValues(pyomoModel):
+    return {
+        "real?": {i: pyomoModel.real[i].value for i in pyomoModel.realI},
+        "int?": {i: pyomoModel.int[i].value for i in pyomoModel.intI}
+    }
+
+# load varValues into the var arrays of pyomoModel, skipping indices it lacks
+def putVarValues(pyomoModel, values):
+    for i in values["real?"]:
+        if i in pyomoModel.realI:
+            pyomoModel.real[i].set_value(values["real?"][i], skip_validation=True)
+    for i in values["int?"]:
+        if i in pyomoModel.intI:
+            pyomoModel.int[i].set_value(values["int?"][i], skip_validation=True)
+
+# constraints of pyomoModel that depend on mutable params, e.g., the input
+# params of a compiled model; computed once per model
+def paramConstraints(pyomoModel):
+    from pyomo.core.expr.visitor import identify_mutable_parameters
+    constraints = getattr(pyomoModel, "dgalParamConstraints", None)
+    if constraints is None:
+        constraints = [c for c in pyomoModel.component_data_objects(Constraint, active=True)
+                       if c.parent_component().local_name != "dgalCutoff"
+                       and next(identify_mutable_parameters(c.expr), None) is not None]
+        pyomoModel.dgalParamConstraints = constraints
+    return constraints
+
+# objective cutoff: the constraint dgalCutoff of pyomoModel bounds its objective
+# by cutoff (from below if maximized), so that the solver prunes the solutions
+# that are not better than cutoff, and returns infeasible if there are none,
+# e.g., cutoff is the objective of an incumbent of another model. The constraint
+# is replaced on every solve, in the solver of session too if it is persistent
+# and already holds pyomoModel; cutoff None removes it
+def applyCutoff(pyomoModel, cutoff, session=None):
+    opt = None
+    if session is not None and session["pyomoModel"] is pyomoModel and isinstance(session["opt"], PersistentSolver):
+        opt = session["opt"]
+    if hasattr(pyomoModel, "dgalCutoff"):
+        if opt is not None:
+            opt.remove_constraint(pyomoModel.dgalCutoff)
+        pyomoModel.del_component(pyomoModel.dgalCutoff)
+    if cutoff is None:
+        return
+    objective = pyomoModel.pyomoObjective
+    if objective.sense == minimize:
+        pyomoModel.dgalCutoff = Constraint(expr=objective.expr <= cutoff)
+    else:
+        pyomoModel.dgalCutoff = Constraint(expr=objective.expr >= cutoff)
+    if opt is not None:
+        opt.add_constraint(pyomoModel.dgalCutoff)
+
+# solver option bounding the solve time, per (prefix of the) name of the
+# direct and persistent solver interfaces, which ignore the timelimit argument
+timeLimitOptions = {"gurobi": "TimeLimit", "cplex": "timelimit", "xpress": "maxtime"}
+
+# arguments of opt.solve bounding its solve time by timeLimit (seconds), if not
+# None: the time limit option of a direct or persistent interface (see
+# timeLimitOptions), else the timelimit argument (e.g., of APPSI interfaces,
+# or of shell solvers such as cbc or glpk)
+def timeLimitArgs(opt, timeLimit):
+    if timeLimit is None:
+        return {}
+    if isinstance(opt, DirectOrPersistentSolver):
+        for prefix, option in timeLimitOptions.items():
+            if opt.name.startswith(prefix):
+                return {"options": {option: timeLimit}}
+        raise Exception("dgal: no time limit option known for solver " + opt.name)
+    return {"timelimit": timeLimit}
+
+# solve pyomoModel with opt, loading the solution only if optimal, since some
+# solver interfaces (e.g., APPSI) raise when there is no solution to load,
+# e.g., of a model made infeasible by a cutoff
+# the solver log is traced (at INFO) only if requested by startTrace
+def solveAndLoad(opt,pyomoModel,**kwargs):
+    if tracing["solverLog"] and logger.isEnabledFor(logging.INFO):
+        stream = io.StringIO()
+        with capture_output(stream, capture_fd=True):
+            results = opt.solve(pyomoModel,load_solutions=False,tee=True,**kwargs)
+        logger.info("solver log:\n%s", stream.getvalue())
     else:
-        print("varValue_error: type is neither real? nor int?")
-        value = "error"
-    return(value)
-#---------------------------------------------------------------------
-# assumes that pyomoResult has values for all enumerated dgalVars in enumInput
-# answers is enumerated input initially, then replaced with corresponding values
-# from pyo.values
-
-
-def dgalOptResult(enumInput,pyomoModel):
-    dgType = dgalType(enumInput)
-    debug("dgType_in_dgalOptResult", dgType)
-    if dgType == "real?" or dgType == "int?":
-        debug("passed real? or int? test in dgalOptResult",dgType)
-        return varValue(pyomoModel, dgType, enumInput["index"])
-    if type(enumInput) == dict:    #i.e., dict that is not dgalTypes
-        for key in enumInput:
-            debug("key in enumInput:",key)
-            enumInput[key] = dgalOptResult(enumInput[key],pyomoModel)
-        return enumInput
-    if type(enumInput) == list:
-        for i in range(len(enumInput)):
-            enumInput[i] = dgalOptResult(enumInput[i],pyomoModel)
-        return enumInput
-    return enumInput  #can't contain dgalTypes
+        results = opt.solve(pyomoModel,load_solutions=False,**kwargs)
+    if results.solver.termination_condition == TerminationCondition.optimal:
+        pyomoModel.solutions.load_from(results)
+    return results
+
+def solveInSession(pyomoModel,session,timeLimit=None):
+    opt = session["opt"]
+    persistent = isinstance(opt, PersistentSolver)
+    if session["pyomoModel"] is not pyomoModel:
+        # newly built model: start from the incumbent of the previous one
+        if session["incumbent"] is not None:
+            putVarValues(pyomoModel, session["incumbent"])
+        if persistent:
+            opt.set_instance(pyomoModel)
+        session["pyomoModel"] = pyomoModel
+    elif persistent:
+        # the objective, and the constraints of compiled models, may depend on
+        # mutable params updated since the last solve; a (legacy) persistent
+        # solver only sees such updates when they are sent again
+        for c in paramConstraints(pyomoModel):
+            opt.remove_constraint(c)
+            opt.add_constraint(c)
+        opt.set_objective(pyomoModel.pyomoObjective)
+    warmstart = session["incumbent"] is not None and opt.warm_start_capable()
+    start = time.perf_counter()
+    if warmstart:
+        results = solveAndLoad(opt,pyomoModel,warmstart=True,**timeLimitArgs(opt,timeLimit))
+    else:
+        results = solveAndLoad(opt,pyomoModel,**timeLimitArgs(opt,timeLimit))
+    session["solveTimes"].append(time.perf_counter() - start)
+    if results.solver.termination_condition == TerminationCondition.optimal:
+        session["incumbent"] = varValues(pyomoModel)
+    return results
+
+#-----------------------------------------------------------------
+# Models decided without a solver round-trip: termination condition of
+# pyomoModel, "infeasible" if it is marked so (its constraints are constant
+# False, or contradict its var bounds, see pushSimpleBounds), or if all its
+# vars are fixed, "optimal" if its active constraints then hold and its
+# objective is at least as good as cutoff, and "infeasible" otherwise;
+# None if the solver is needed
+def trivialStatus(pyomoModel, cutoff=None):
+    if getattr(pyomoModel, "dgalInfeasible", False):
+        return "infeasible"
+    if not builtins.all(v.fixed for v in pyomoModel.component_data_objects(Var)):
+        return None
+    tolerance = 1e-9
+    for c in pyomoModel.component_data_objects(Constraint, active=True):
+        if c.parent_component().local_name == "dgalCutoff":
+            continue
+        body = pyo.value(c.body)
+        if (c.lower is not None and body < pyo.value(c.lower) - tolerance) or \
+           (c.upper is not None and body > pyo.value(c.upper) + tolerance):
+            return "infeasible"
+    if cutoff is not None:
+        objective = pyomoModel.pyomoObjective
+        value = pyo.value(objective.expr)
+        if (objective.sense == minimize and value > cutoff + tolerance) or \
+           (objective.sense == maximize and value < cutoff - tolerance):
+            return "infeasible"
+    return "optimal"
+
+def trivialResult(pyomoModel,index,terminationCondition,options):
+    dgalOutput = {"status": {"solver_status": "ok", "termination_condition": terminationCondition},
+                  "solution": "none"}
+    if terminationCondition == "optimal":
+        if index is not None:
+            dgalOutput["solution"] = varSolution(index,pyomoModel)
+        dgalOutput.update(evaluatedResult(pyomoModel))
+    if "debug" in options and options["debug"]:
+        dgalOutput["report"] = {"message": "decided without solver"}
+    return dgalOutput
 
 #-----------------------------------------------------------------
 # model: pyomoModel w/objective and constraints
 # config: is a dictionary with a solver setting, initially just
-#          {"solver": solver}
+#          {"solver": solver}, optionally with a solver session
+#          {"solver": solver, "session": solverSession(solver)}
 # this function needs to be cleaned, by eliminating writing into files
-def solvePyomoModelConstructDgalResult(pyomoModel,enumInput,options):
-    debug("solver:", options["solver"])
-    opt = SolverFactory(options["solver"])
-    # pdb.set_trace()
-    results = opt.solve(pyomoModel,tee=True)
+#          options["solver"] == "scipy_milp" selects the sparse-matrix backend
+#          options["timeLimit"]: optional bound on the solve time (seconds),
+#          of every backend (see timeLimitArgs)
+#          options["cutoff"]: optional objective cutoff (see applyCutoff); the
+#          status is infeasible if no solution is better than cutoff
+def solvePyomoModelConstructDgalResult(pyomoModel,index,options):
+    trivial = trivialStatus(pyomoModel, options.get("cutoff"))
+    if trivial is not None:
+        return trivialResult(pyomoModel,index,trivial,options)
+    stats["solves"] += 1
+    logger.info("solve %d with %s", stats["solves"], options["solver"])
+    if options["solver"] == "scipy_milp":
+        return solveSparseMilpConstructDgalResult(pyomoModel,index,options)
+    applyCutoff(pyomoModel, options.get("cutoff"), options.get("session"))
+    if "session" in options:
+        results = solveInSession(pyomoModel,options["session"],options.get("timeLimit"))
+    else:
+        opt = SolverFactory(options["solver"])
+        if isinstance(opt, PersistentSolver):
+            opt.set_instance(pyomoModel)
+        # pdb.set_trace()
+        results = solveAndLoad(opt,pyomoModel,**timeLimitArgs(opt,options.get("timeLimit")))
     debug("model after solve:",pyomoModel)
 # compute status: solver_status and termination_condition
     # pdb.set_trace()
@@ -252,18 +994,23 @@ def solvePyomoModelConstructDgalResult(pyomoModel,enumInput,options):
         else:
             status["termination_condition"] = str(results.solver.termination_condition)
     else:
-        status = {"solver_status": "not_ok"}
+        # e.g., warning of an infeasible model
+        status = {"solver_status": "not_ok",
+                  "termination_condition": str(results.solver.termination_condition)}
 # compute optAnswer, if exists, and make it "none" otherwise
     if status["termination_condition"] == "optimal":
 #           answer = copy.deepcopy(enumInput)
         # pdb.set_trace()
-        optAnswer = dgalOptResult(enumInput,pyomoModel)
-        debug("optAnswer before dgalOptResult return",optAnswer)
+        roundIntVars(pyomoModel)
+        optAnswer = "none" if index is None else varSolution(index,pyomoModel)
+        debug("optAnswer before return",optAnswer)
         # pdb.set_trace()
     else:
         optAnswer = "none"
 # compute dgalOutp withut status and answer
     dgalOutput = { "status": status, "solution": optAnswer}
+    if status["termination_condition"] == "optimal":
+        dgalOutput.update(evaluatedResult(pyomoModel))
 # add report to optAnswer if options request debug
     if "debug" in options and options["debug"]:
         dgalOutput["report"] = produceReport(results)
@@ -274,9 +1021,11 @@ def solvePyomoModelConstructDgalResult(pyomoModel,enumInput,options):
 def produceReport(results):
 #    pyomoModel.solutions.store_to(results)
     debug("pyomo results:",results)
-    results.write(filename='result.json', format='json')
-    f = open("result.json", "r")
-    dictPyomoResult = json.loads(f.read())
+    # written to a string rather than result.json, so that concurrent
+    # solves (e.g., of a parallel sweep) do not overwrite each other
+    stream = io.StringIO()
+    results.write(ostream=stream, format='json')
+    dictPyomoResult = json.loads(stream.getvalue())
     debug("dictPyomoResult read from results file", dictPyomoResult)
     dictPyomoResult["Problem"][0]["Lower bound"] = \
         str(dictPyomoResult["Problem"][0]["Lower bound"])
@@ -286,25 +1035,192 @@ def produceReport(results):
 
 
 #----------------------------------------------------------
-#
+# returns {"status": status, "solution": the optimal input, or "none"}, and,
+# if optimal, "output": the output of dgalModel at the optimal input, and
+# "objective": the objective value (see evaluatedResult)
 def optimize(dgalModel,input,minMax,obj,constraints,options):
     # enumerate dgalVars in input
-    counts = {"real?": -1, "int?": -1}
-    enumInput = copy.deepcopy(input)
-    enumDgalVars(enumInput, counts)
-    debug("enumInput in py", enumInput)
-    enumInputAndCounts = { "enumInput": enumInput, "counts":counts}
-    debug("enumInputAndCounts_before_create_Pyomo_model", enumInputAndCounts)
-    pyomoModel = createPyomoModel(dgalModel,enumInputAndCounts,minMax,obj,constraints)
+    index = varIndex(input)
+    debug("var paths of input", index["paths"])
+    pyomoModel = createPyomoModel(dgalModel,index,minMax,obj,constraints)
     # pdb.set_trace()
-    debug("enumInput before solving", json.dumps(enumInput))
-    pyomoModel.pprint()
-    answer = solvePyomoModelConstructDgalResult(pyomoModel,enumInput,options)
+    traceModel("pyomo model", pyomoModel)
+    answer = solvePyomoModelConstructDgalResult(pyomoModel,index,options)
     # pyomoModel.display()
     # pdb.set_trace()
     return answer
 # extend for special case when constraints generated are Bool True or False
 
+#----------------------------------------------------------
+# parametric mode: the AM is traced and the Pyomo model is built only once,
+# with the objective depending on mutable params (e.g., utility weights).
+# Re-optimizing for new param values only updates the params and re-solves.
+#- params: dict {paramName: initialValue}
+#- obj: function (output, params) -> objective expression, where params maps
+#       param names to Pyomo params
+# returns a parametric model to be passed to optimizeParametric
+def createParametricModel(dgalModel,input,minMax,obj,constraints,params):
+    index = varIndex(input)
+    pyomoModel = createPyomoModel(dgalModel,index,minMax,obj,constraints,params)
+    return { "pyomoModel": pyomoModel, "varIndex": index, "params": list(params.keys())}
+
+# paramValues: dict {paramName: value}; params not in paramValues keep their
+# current values
+def optimizeParametric(parametricModel,paramValues,options):
+    pyomoModel = parametricModel["pyomoModel"]
+    for p in paramValues:
+        pyomoModel.dgalParam[p] = paramValues[p]
+    answer = solvePyomoModelConstructDgalResult(pyomoModel,parametricModel["varIndex"],options)
+    return answer
+
+#----------------------------------------------------------
+# disjunctive mode: alternative models (e.g., the vtSpecs of a set) are merged
+# into a single MIP with a binary selector per alternative, so that a single
+# solve returns the best alternative and its optimal input.
+# Each alternative has its own vars. Its constraints, and the link of the
+# shared value vars to its values, only hold if it is selected (big-M
+# reformulation of a Pyomo GDP disjunction). The objective is a function of
+# the value vars, and possibly of mutable params, as in parametric mode.
+# The big-M of each constraint is computed by Pyomo from var bounds, which are
+# derived per alternative by feasibility-based bound tightening (FBBT) of its
+# constraints, so that no global big-M has to exceed every value range.
+#- alternatives: list of {"model": dgalModel, "input": input,
+#      "values": function output -> dict {valueName: expression},
+#      "constraints": function output -> dgalBoolean}
+#  all alternatives must have values of the same names
+#- objective: function (values) -> objective expression, or (values, params)
+#      if params are given, where values maps value names to Pyomo vars
+#- params: optional dict {paramName: initialValue}
+#- bigM: optional big-M for the constraints whose vars FBBT cannot bound;
+#      without it, an alternative with unbounded vars raises an exception
+# returns a disjunctive model to be passed to optimizeDisjunctive
+def createDisjunctiveModel(alternatives, minMax, objective, params=None, bigM=None):
+    from pyomo.gdp import Disjunct, Disjunction
+    from pyomo.contrib.fbbt.fbbt import fbbt, compute_bounds_on_expr
+    from pyomo.common.errors import InfeasibleConstraintException
+
+    # enumerate the dgalVars of all alternatives, into the same var arrays
+    counts = {"real?": -1, "int?": -1}
+    indexes = [varIndex(alternative["input"], counts) for alternative in alternatives]
+
+    model = ConcreteModel()
+    model.realI = RangeSet(0,counts["real?"])
+    model.intI = RangeSet(0,counts["int?"])
+    model.real = Var(model.realI, domain=Reals)
+    model.int = Var(model.intI, domain=Integers)
+    for index in indexes:
+        putVarBounds(index,model)
+    model.altI = RangeSet(0,len(alternatives)-1)
+    model.alternative = Disjunct(model.altI)
+    # the traced output of each alternative (see outputValue)
+    model.dgalOutputs = []
+
+    values = None
+    valueBounds = dict()
+    for k, alternative in enumerate(alternatives):
+        inputWithPyomoVars = putPyomoVars(indexes[k],model)
+        output = alternative["model"](inputWithPyomoVars)
+        model.dgalOutputs.append(output)
+        altValues = alternative["values"](output)
+        if values is None:
+            model.valueI = Set(initialize=list(altValues.keys()))
+            model.value = Var(model.valueI, domain=Reals)
+            values = {name: model.value[name] for name in altValues}
+        disjunct = model.alternative[k]
+        disjunct.dgalConstraint = ConstraintList()
+        disjunct.dgalValue = ConstraintList()
+        constraintList = alternative["constraints"](output)
+        if constraintList is not True and constraintList is not False:
+            for c in constraintList:
+                disjunct.dgalConstraint.add(c)
+            # the vars of an alternative are its own, so that bounds implied
+            # by its constraints are valid bounds of the whole model
+            try:
+                fbbt(disjunct)
+            except InfeasibleConstraintException:
+                constraintList = False
+        if constraintList is False:
+            # infeasible alternative, never selected
+            disjunct.indicator_var.fix(False)
+            continue
+        for name in altValues:
+            disjunct.dgalValue.add(model.value[name] == altValues[name])
+            lb, ub = compute_bounds_on_expr(altValues[name])
+            if name not in valueBounds:
+                valueBounds[name] = (lb, ub)
+            else:
+                prevLb, prevUb = valueBounds[name]
+                valueBounds[name] = (None if lb is None or prevLb is None else builtins.min(lb, prevLb),
+                                     None if ub is None or prevUb is None else builtins.max(ub, prevUb))
+    if values is not None:
+        for name in valueBounds:
+            model.value[name].setlb(valueBounds[name][0])
+            model.value[name].setub(valueBounds[name][1])
+    if bigM is None:
+        from pyomo.core.expr.visitor import identify_variables
+        unbounded = set()
+        for k in model.altI:
+            if model.alternative[k].indicator_var.fixed:
+                continue
+            for c in model.alternative[k].component_data_objects(Constraint):
+                unbounded.update([v.name for v in identify_variables(c.body)
+                                  if v.lb is None or v.ub is None])
+        unbounded = sorted(unbounded)
+        if unbounded:
+            raise Exception("dgal: createDisjunctiveModel: no bounds found for vars "
+                            + str(unbounded[:5]) + "; bound them by constraints or pass bigM")
+    model.selection = Disjunction(expr=[model.alternative[k] for k in model.altI])
+
+    if params is None:
+        obj = objective(values)
+    else:
+        model.paramI = Set(initialize=list(params.keys()))
+        model.dgalParam = Param(model.paramI, mutable=True, initialize=params)
+        obj = objective(values, {p: model.dgalParam[p] for p in params})
+    if minMax == "min":
+        model.pyomoObjective = Objective(expr=obj, sense=minimize)
+    elif minMax == "max":
+        model.pyomoObjective = Objective(expr=obj, sense=maximize)
+    else:
+        raise Exception("dgal: minMax flag error: " + str(minMax))
+
+    if bigM is None:
+        TransformationFactory('gdp.bigm').apply_to(model)
+    else:
+        TransformationFactory('gdp.bigm').apply_to(model, bigM=bigM)
+    return { "pyomoModel": model, "varIndexes": indexes,
+             "params": list(params.keys()) if params is not None else []}
+
+# paramValues: dict {paramName: value}, as in optimizeParametric
+# returns the answer of optimize, where "solution" is the optimal input of the
+# selected alternative, and "alternative" its index
+def optimizeDisjunctive(disjunctiveModel,paramValues,options):
+    pyomoModel = disjunctiveModel["pyomoModel"]
+    for p in paramValues:
+        pyomoModel.dgalParam[p] = paramValues[p]
+    # only the solution of the selected alternative is read
+    answer = solvePyomoModelConstructDgalResult(pyomoModel,None,options)
+    if answer["status"]["termination_condition"] == "optimal":
+        selected = [k for k in pyomoModel.altI
+                    if pyo.value(pyomoModel.alternative[k].binary_indicator_var) > 0.5]
+        answer["alternative"] = selected[0]
+        answer["solution"] = varSolution(disjunctiveModel["varIndexes"][selected[0]],pyomoModel)
+        answer["output"] = outputValue(pyomoModel.dgalOutputs[selected[0]])
+    return answer
+
+#----------------------------------------------------------
+# compiled mode: the model is compiled once (and cached) for the shape of input,
+# and later calls with inputs of the same shape (e.g., new prices) only bind the
+# new param values and solve
+#- options: as in optimize; options["compileCacheDir"] enables the on-disk cache
+def optimizeCompiled(dgalModel,input,minMax,obj,constraints,options):
+    index = varIndex(input)
+    compiledModel = compileDgalModel(dgalModel,index,minMax,obj,constraints,
+        options.get("compileCacheDir"))
+    pyomoModel = instantiateCompiledModel(compiledModel,input)
+    answer = solvePyomoModelConstructDgalResult(pyomoModel,index,options)
+    return answer
+
 # def min(model,input,obj,constraints,config):
 def min(p):
     optAnswer = optimize( \
@@ -1,11 +1,16 @@
-import re
 import sys
 import json
+import time
+import logging
 import math
 from math import inf
 from pathlib import Path
 from itertools import product
-import importlib.util
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.spatial import ConvexHull
+from scipy.spatial import QhullError
 
 # Get the PRAXIS DGMS root directory
 project_root = Path(__file__).resolve().parents[2]
@@ -15,6 +20,24 @@ sys.path.insert(0, str(project_root))  # add repo root to Python path
 from lib.dgal_lib import dgalPy as dgal
 from lib.optiguide_lib import paretoDB as podb
 from lib.vThings.vtOperators.vtFunctions import boundConstraints
+from lib.optiguide_lib.specLoader import (
+    loadConfig,
+    extractModel,
+    extractInput,
+    extractMetricSchema,
+    extractObjsSchema,
+    extractObjsFunc,
+    extractConstFunc,
+    specFingerprints
+)
+from lib.optiguide_lib.preprocessingCache import (
+    cacheKey,
+    readCached,
+    writeCached
+)
+
+# progress of preprocessing, traced as the "dgal" logger (see dgal.startTrace)
+logger = logging.getLogger("dgal.preprocessing")
 
 def get_project_dir():
     if "--project-dir" in sys.argv:
@@ -22,103 +45,6 @@ def get_project_dir():
         return Path(sys.argv[i + 1]).resolve()
     raise SystemExit("Please provide --project-dir <path>")
 
-# Get the project directory
-project_dir = get_project_dir()
-
-#-------------------------------------------------------------------------------
-# Extract model from vtSpec
-def extractModel(vtSpec_path):
-    with open(project_dir / vtSpec_path,"r") as f:
-        vtSpec = json.load(f)
-    model_path = vtSpec["model"]["@functionRef"].replace('/', '.')
-    model_path = re.sub(r'^\.+', '', model_path)
-    module_name, function_name = model_path.rsplit(':', 1)
-
-    # Remove the '.py' from the module name if it's there
-    if module_name.endswith('.py'):
-        module_name = module_name[:-3]
-
-    # Use importlib.util to load the module
-    spec = importlib.util.spec_from_file_location(module_name, project_dir / vtSpec["model"]["@functionRef"].split(':')[0])
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-
-    model = getattr(module, function_name)
-    return model
-
-#-------------------------------------------------------------------------------
-# Extract input from vtSpec
-def extractInput(vtSpec_path):
-    with open(project_dir / vtSpec_path,"r") as f:
-        vtSpec = json.load(f)
-    input_path = vtSpec["parametersSchema"]
-    with open(project_dir / input_path,"r") as f:
-        input = json.load(f)
-    return input
-
-#-------------------------------------------------------------------------------
-# Extract metricSchema from vtSpec
-def extractMetricSchema(vtSpec_path):
-    with open(project_dir / vtSpec_path,"r") as f:
-        vtSpec = json.load(f)
-    metricSchema_path = vtSpec["metricSchema"]
-    with open(project_dir / metricSchema_path,"r") as f:
-        metricSchema = json.load(f)
-    return metricSchema
-
-#-------------------------------------------------------------------------------
-# Extract objectives schema from reqSpec
-def extractObjsSchema(config):
-    with open(project_dir / config["reqSpec"], "r") as f:
-        reqSpec = json.load(f)
-    objsSchema = reqSpec["objectives"]["schema"]
-    return objsSchema
-
-#-------------------------------------------------------------------------------
-# Extract objectives function from reqSpec
-def extractObjsFunc(config):
-    with open(project_dir / config["reqSpec"],"r") as f:
-        reqSpec = json.load(f)
-    objsFunc_path = reqSpec["objectives"]["function"]["@functionRef"].replace('/', '.')
-    objsFunc_path = re.sub(r'^\.+', '', objsFunc_path)
-    module_name, function_name = objsFunc_path.rsplit(':', 1)
-
-    # Remove the '.py' from the module name if it's there
-    if module_name.endswith('.py'):
-        module_name = module_name[:-3]
-
-    # Use importlib.util to load the module
-    spec = importlib.util.spec_from_file_location(module_name, project_dir / reqSpec["objectives"]["function"]["@functionRef"].split(':')[0])
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-
-    objsFunc = getattr(module, function_name)
-    return objsFunc
-
-#-------------------------------------------------------------------------------
-# Extract constraints function from reqSpec
-def extractConstFunc(config):
-    with open(project_dir / config["reqSpec"],"r") as f:
-        reqSpec = json.load(f)
-    constFunc_path = reqSpec["constraints"]["@functionRef"].replace('/', '.')
-    constFunc_path = re.sub(r'^\.+', '', constFunc_path)
-    module_name, function_name = constFunc_path.rsplit(':', 1)
-
-    # Remove the '.py' from the module name if it's there
-    if module_name.endswith('.py'):
-        module_name = module_name[:-3]
-
-    # Use importlib.util to load the module
-    spec = importlib.util.spec_from_file_location(module_name, project_dir / reqSpec["constraints"]["@functionRef"].split(':')[0])
-    module = importlib.util.module_from_spec(spec)
-    sys.modules[module_name] = module
-    spec.loader.exec_module(module)
-
-    constFunc = getattr(module, function_name)
-    return constFunc
-
 #-------------------------------------------------------------------------------
 # Generate a list of weight combinations for all objectives
 def generateWeights(objsSchema, num_entries, e):
@@ -140,28 +66,94 @@ def generateWeights(objsSchema, num_entries, e):
     return weightsList
 
 #-------------------------------------------------------------------------------
+# Adaptive generator of weight combinations (NISE / outer approximation), as an
+# alternative to the fixed grid of generateWeights. It yields the next weight
+# dict to solve for, and must be sent the norm_objectives of the solution found
+# (normalized objectives are maximized, see paretoDB.normObjectives).
+# The next weights are the normals of the facets of the convex hull of the
+# supported points found so far, extended by free disposal (i.e., with each
+# point z also z - M*e_k). Only facets with non-negative normals face the
+# frontier; zero components are raised to e, so that facets next to weakly
+# supported regions are probed as well. A facet whose weight yields no point
+# beyond the known ones is confirmed. The generator stops when every facet is
+# confirmed, i.e. when the complete supported frontier is found, which costs
+# about one solve per vertex and facet instead of a dense grid.
+# For two objectives this is the dichotomic (NISE) scheme.
+#- e: minimal weight of an objective
+#- tol: minimal improvement beyond the known points for a point to count as new
+#- maxSolves: optional bound on the number of weights generated
+def adaptiveWeights(objsSchema, e=0.0001, tol=1e-6, maxSolves=None):
+    objs = list(objsSchema.keys())
+    n = len(objs)
+    M = 10.0
+    points = []
+    tried = set()
+    solves = 0
+
+    def weightsDict(w):
+        return {obj: float(w[k]) for k, obj in enumerate(objs)}
+
+    # optimize each single objective first
+    for k in range(n):
+        w = np.full(n, e)
+        w[k] = 1.0
+        w = w / w.sum()
+        tried.add(tuple(np.round(w, 9)))
+        z = yield weightsDict(w)
+        solves += 1
+        points.append(np.array([z[obj] for obj in objs]))
+
+    while maxSolves is None or solves < maxSolves:
+        known = np.unique(np.round(np.array(points), 12), axis=0)
+        extended = np.vstack([known] + [known - M * np.eye(n)[k] for k in range(n)])
+        try:
+            hull = ConvexHull(extended)
+        except QhullError:
+            return
+        # next facet facing the frontier, whose weight was not tried yet
+        w = None
+        for equation in hull.equations:
+            normal = equation[:-1]
+            if np.all(normal > -1e-9):
+                candidate = np.maximum(normal, e)
+                candidate = candidate / candidate.sum()
+                key = tuple(np.round(candidate, 9))
+                if key not in tried:
+                    w = candidate
+                    break
+        if w is None:
+            return
+        tried.add(key)
+        level = np.max(known.dot(w))
+        z = yield weightsDict(w)
+        solves += 1
+        z = np.array([z[obj] for obj in objs])
+        if z.dot(w) > level + tol:
+            points.append(z)
 
-# Compute min and max possible value for each objective
-def computeMinMax(objsSchema, config):
-
-    # extract objectives function from reqSpec
-    objsFunc = extractObjsFunc(config)
-
-    # extract constraints function from reqSpec
-    constFunc = extractConstFunc(config)
-
-    vtSpecSet_minMaxObjs = []
-
-    vtSpecs = config["vtSpecs"]
-    for vtSpec in vtSpecs:
-        # extract model from vtSpec
-        model = extractModel(vtSpec)
-
-        # extract input from vtSpec
-        input = extractInput(vtSpec)
-
-        # extract metricSchema from vtSpec
-        metricSchema = extractMetricSchema(vtSpec)
+#-------------------------------------------------------------------------------
+# Payoff table: for each vtSpec, objective and direction ("min" or "max"), the
+# objectives of the solution optimizing that objective in that direction.
+# All the solves of a vtSpec share a single traced model, which maximizes
+# sum(c[obj] * objective[obj]) with the coefficients c as mutable params:
+# maximizing obj is c[obj] = 1, minimizing it is c[obj] = -1, the other
+# coefficients being 0. Only the coefficients change between the solves.
+# Its constraints are those of the sweep (see vtFunctions.reqConstraints), so
+# that the best objectives of a vtSpec bound its utility in the sweep.
+
+# models of the payoff table per vtSpec, built on first use, per process
+payoffModels = {}
+
+def payoffModel(project_dir, config, vtSpec, objsSchema):
+    if vtSpec not in payoffModels:
+        # extract objectives and constraints functions from reqSpec
+        objsFunc = extractObjsFunc(project_dir, config)
+        constFunc = extractConstFunc(project_dir, config)
+
+        # extract model, input and metricSchema from vtSpec
+        model = extractModel(project_dir, vtSpec)
+        input = extractInput(project_dir, vtSpec)
+        metricSchema = extractMetricSchema(project_dir, vtSpec)
 
         def constraints(o):
             modelComputedConstraints = constFunc(o)
@@ -175,98 +167,207 @@ def computeMinMax(objsSchema, config):
             ])
             return(constraints)
 
-        minMaxObjs = {}
-        for obj in objsSchema:
-            if objsSchema[obj]["minMax"]=="min": # a minimization metric
-            # optimizing the objective to find its Minimum value
-                optAnswer_minObj = dgal.min({
-                    "model": model,
-                    "input": input,
-                    "obj": lambda o: objsFunc(o)[obj],
-                    "constraints": constraints,
-                    #"options": {"problemType": "mip", "solver":"glpk","debug": True}
-                    "options": {"problemType": "mip", "solver":"gurobi_direct", "debug": True}
-                    })
-                optOutput = model(optAnswer_minObj["solution"])
-                minObj = objsFunc(optOutput)[obj]
-            # optimizing the objective to find its Maximum value
-                optAnswer_maxObj = dgal.max({
-                    "model": model,
-                    "input": input,
-                    "obj": lambda o: objsFunc(o)[obj],
-                    "constraints": lambda o: dgal.all([ constraints(o), objsFunc(o)[obj] <= objsSchema[obj]["ub"]]),
-                    #"options": {"problemType": "mip", "solver":"glpk","debug": True}
-                    "options": {"problemType": "mip", "solver":"gurobi_direct", "debug": True}
-                    })
-                optOutput = model(optAnswer_maxObj["solution"])
-                maxObj = objsFunc(optOutput)[obj]
-
-            else:                           # a maximization metric
-            # optimizing the objective to find its Maximum value
-                optAnswer_maxObj = dgal.max({
-                    "model": model,
-                    "input": input,
-                    "obj": lambda o: objsFunc(o)[obj],
-                    "constraints": constraints,
-                    #"options": {"problemType": "mip", "solver":"glpk","debug": True}
-                    "options": {"problemType": "mip", "solver":"gurobi_direct", "debug": True}
-                    })
-                optOutput = model(optAnswer_maxObj["solution"])
-                maxObj = objsFunc(optOutput)[obj]
-            # optimizing the objective to find its Minimum value
-                optAnswer_minObj = dgal.min({
-                    "model": model,
-                    "input": input,
-                    "obj": lambda o: objsFunc(o)[obj],
-                    "constraints": lambda o: dgal.all([ constraints(o) , objsFunc(o)[obj] >= objsSchema[obj]["lb"]]),
-                    #"options": {"problemType": "mip", "solver":"glpk","debug": True}
-                    "options": {"problemType": "mip", "solver":"gurobi_direct", "debug": True}
-                    })
-                optOutput = model(optAnswer_minObj["solution"])
-                minObj = objsFunc(optOutput)[obj]
-
-            minMaxObjs.update({obj :{"min":minObj, "max": maxObj} })
-            #minMaxObjs[obj]= {"min":minObj, "max": maxObj}
-
-        vtSpecSet_minMaxObjs.append(minMaxObjs)
-
-    # Initialize a dictionary to hold the min/max values for each obj in the vtSpecSet_minMaxObjs list
-    result = {}
+        def obj(o, c):
+            objs = objsFunc(o)
+            return sum([c[objName] * objs[objName] for objName in objsSchema])
+
+        solver = config["settings"].get("solver", podb.defaultSolver)
+        payoffModels[vtSpec] = {
+            "model": model,
+            "objsFunc": objsFunc,
+            "parametricModel": dgal.createParametricModel(model, input, "max", obj, constraints,
+                                                          {objName: 0 for objName in objsSchema}),
+            "options": {"problemType": "mip", "solver": solver, "debug": True,
+                        "session": dgal.solverSession(solver)}
+        }
+    return payoffModels[vtSpec]
+
+# payoff table entry of a vtSpec: the objectives of the optimum of obj in
+# direction, for each obj of objsSchema and direction
+def payoffEntry(project_dir, config, vtSpec, objsSchema, obj, direction):
+    p = payoffModel(project_dir, config, vtSpec, objsSchema)
+    coefficients = {objName: 0 for objName in objsSchema}
+    coefficients[obj] = 1 if direction == "max" else -1
+    optAnswer = dgal.optimizeParametric(p["parametricModel"], coefficients, p["options"])
+    optOutput = optAnswer["output"]
+    return p["objsFunc"](optOutput)
+
+# payoff table of a task (project_dir, config, vtSpec, objsSchema):
+# {obj: {"min": objectives, "max": objectives}}, with the number of DGAL solves.
+# A task covers all the solves of a vtSpec, so that they share its model and
+# solver session in one process
+def payoffSpecTable(task):
+    project_dir, config, vtSpec, objsSchema = task
+    solvesBefore = dgal.stats["solves"]
+    table = {obj: {direction: payoffEntry(project_dir, config, vtSpec, objsSchema, obj, direction)
+                   for direction in ["min", "max"]}
+             for obj in objsSchema}
+    return {"table": table, "solves": dgal.stats["solves"] - solvesBefore}
+
+# Compute the payoff table of the vtSpecs of config:
+# {vtSpec: {obj: {"min": objectives, "max": objectives}}}
+# The tables of the vtSpecs are cached (see preprocessingCache), keyed by the
+# fingerprints of the vtSpec and the reqSpec, so that only the vtSpecs that
+# changed since the last run are solved. settings "workers" > 1 solves them
+# on a pool of that many processes, one task per vtSpec
+def payoffTable(project_dir, objsSchema, config):
+    settings = config["settings"]
+    fingerprints = specFingerprints(project_dir, config)
+    keys = {vtSpec: cacheKey(fingerprints["vtSpecs"][vtSpec], fingerprints["reqSpec"]) for vtSpec in config["vtSpecs"]}
+
+    table = {}
+    tasks = []
+    for vtSpec in config["vtSpecs"]:
+        cached = readCached(settings, "payoff", keys[vtSpec])
+        if cached is not None:
+            table[vtSpec] = cached
+            continue
+        table[vtSpec] = None    # solved below, in the order of config
+        tasks.append((project_dir, config, vtSpec, objsSchema))
+
+    workers = settings.get("workers", 1)
+    if workers > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=podb.startSettingsTrace,
+                                 initargs=(settings, True)) as pool:
+            specTables = list(pool.map(payoffSpecTable, tasks))
+        dgal.stats["solves"] += sum([specTable["solves"] for specTable in specTables])
+    else:
+        specTables = [payoffSpecTable(task) for task in tasks]
+
+    for (project_dir, config, vtSpec, objsSchema), specTable in zip(tasks, specTables):
+        table[vtSpec] = specTable["table"]
+        writeCached(settings, "payoff", keys[vtSpec], table[vtSpec])
+    return table
+
+#-------------------------------------------------------------------------------
+
+# Compute min and max possible value for each objective, over the vtSpecs,
+# from the payoff table, which is written to payoffTable.json
+def computeMinMax(project_dir, objsSchema, config):
 
-    # Iterate through each minMaxObjs dictionary in the vtSpecSet_minMaxObjs list
-    for dict in vtSpecSet_minMaxObjs:
-        for key, value in dict.items():
-            if key not in result:
-                # If the key doesn't exist in result, initialize it with infinities
-                result[key] = {"min": inf, "max": -inf}
+    table = payoffTable(project_dir, objsSchema, config)
+
+    # Initialize a dictionary to hold the min/max values for each obj over the vtSpecs
+    result = {}
+    for vtSpec in table:
+        for obj in objsSchema:
+            if obj not in result:
+                # If the obj doesn't exist in result, initialize it with infinities
+                result[obj] = {"min": inf, "max": -inf}
             # Update the minimum value
-            result[key]["min"] = min(result[key]["min"], value["min"])
+            result[obj]["min"] = min(result[obj]["min"], table[vtSpec][obj]["min"][obj])
             # Update the maximum value
-            result[key]["max"] = max(result[key]["max"], value["max"])
+            result[obj]["max"] = max(result[obj]["max"], table[vtSpec][obj]["max"][obj])
 
-    #print("vtSpecSet_minMaxObjs: ", vtSpecSet_minMaxObjs)
-    #print("##########")
-    #print("minMaxObjs: ", result)
+    f = open("payoffTable.json","w")
+    f.write(json.dumps({"vtSpecs": table, "minMaxObjs": result}))
 
     return result
 
-#-------------------------------------------------------------------------------
-
-config_path = project_dir / "configs" / "config.json"
+# Load the payoff table written by computeMinMax, e.g. for the UI:
+# {"vtSpecs": {vtSpec: {obj: {"min": objectives, "max": objectives}}}, "minMaxObjs": ...}
+def loadPayoffTable(path="payoffTable.json"):
+    with open(path, "r") as f:
+        return json.load(f)
 
-with open(config_path, "r") as f:
-    config = json.load(f)
+# ideal objectives of each vtSpec of the payoff table {vtSpec: {obj: {"min", "max"}}}:
+# the best value of each objective over the vtSpec, in its minMax sense, which
+# bound the utility the vtSpec can reach (see vtFunctions.vtUtilityBound)
+def idealObjectives(table, objsSchema):
+    return {vtSpec: {obj: table[vtSpec][obj][objsSchema[obj]["minMax"]][obj] for obj in objsSchema}
+            for vtSpec in table}
 
-# extract objectives schema from reqSpec
-objsSchema = extractObjsSchema(config)
+#-------------------------------------------------------------------------------
+# specs whose fingerprints differ from fingerprints.json of the last run
+# (all of them if the reqSpec changed)
+def changedSpecs(fingerprints):
+    if not Path("fingerprints.json").exists():
+        return list(fingerprints["vtSpecs"].keys())
+    with open("fingerprints.json","r") as f:
+        previous = json.load(f)
+    if previous["reqSpec"] != fingerprints["reqSpec"]:
+        return ["reqSpec"] + list(fingerprints["vtSpecs"].keys())
+    return [vtSpec for vtSpec in fingerprints["vtSpecs"]
+            if previous["vtSpecs"].get(vtSpec) != fingerprints["vtSpecs"][vtSpec]]
 
-weightsList = generateWeights(objsSchema, config["settings"]["alpha_entries"], config["settings"]["alpha_epsilon"])
-#print(weightsList)
-#print(len(weightsList))
+#-------------------------------------------------------------------------------
 
-minMaxObjs = computeMinMax(objsSchema, config)
-#print(minMaxObjs)
+# Run the preprocessing pipeline of a project: generate the weights, compute
+# the min/max of each objective, and generate initialDB and paretoDB.
+# Each phase runs exactly once. The results of the vtSpecs that did not change
+# since the last run are reused (see preprocessingCache); the spec fingerprints
+# are written to fingerprints.json, next to the paretoDB store (see paretoDB.writeParetoStore).
+#- project_dir: path of the project folder
+#- settings: optional dict overriding entries of config["settings"]
+#- resume: continue the weight sweep of an interrupted run from its checkpoint
+#  (see paretoDB.openCheckpoint), reusing its min/max of the objectives
+# returns {"minMaxObjs": ..., "solves": number of DGAL solves, "timings": seconds per phase,
+#          "changedSpecs": the specs changed since the last run (see changedSpecs)}
+def runPreprocessing(project_dir, settings=None, resume=False):
+    project_dir = Path(project_dir).resolve()
+    timings = {}
+    solvesBefore = dgal.stats["solves"]
+
+    start = time.perf_counter()
+    config = loadConfig(project_dir)
+    if settings is not None:
+        config["settings"].update(settings)
+    podb.startSettingsTrace(config["settings"])
+
+    # extract objectives schema from reqSpec
+    objsSchema = extractObjsSchema(project_dir, config)
+
+    fingerprints = specFingerprints(project_dir, config)
+    changed = changedSpecs(fingerprints)
+    logger.info("changed specs: %s", changed)
+
+    # settings "weightGenerator": "grid" (default) or "adaptive"
+    if config["settings"].get("weightGenerator", "grid") == "adaptive":
+        weightsList = adaptiveWeights(objsSchema, config["settings"]["alpha_epsilon"])
+    else:
+        weightsList = generateWeights(objsSchema, config["settings"]["alpha_entries"], config["settings"]["alpha_epsilon"])
+    #print(weightsList)
+    #print(len(weightsList))
+    timings["generateWeights"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    manifest = podb.readManifest() if resume else None
+    if manifest is not None:
+        minMaxObjs = manifest["header"]["minMaxObjs"]
+    else:
+        minMaxObjs = computeMinMax(project_dir, objsSchema, config)
+    #print(minMaxObjs)
+    timings["computeMinMax"] = time.perf_counter() - start
+
+    # settings "pruneSpecs": false solves every vtSpec for every weight vector,
+    # instead of pruning the vtSpecs by the ideal objectives of the payoff table
+    ideal = None
+    if config["settings"].get("pruneSpecs", True) and Path("payoffTable.json").exists():
+        ideal = idealObjectives(loadPayoffTable()["vtSpecs"], objsSchema)
+
+    start = time.perf_counter()
+    podb.paretoOptimalDB(project_dir, config, weightsList, minMaxObjs, resume, ideal)
+    timings["paretoOptimalDB"] = time.perf_counter() - start
+
+    f = open("fingerprints.json","w")
+    f.write(json.dumps(fingerprints))
+
+    return {
+        "minMaxObjs": minMaxObjs,
+        "solves": dgal.stats["solves"] - solvesBefore,
+        "timings": timings,
+        "changedSpecs": changed
+    }
 
-podb.paretoOptimalDB(config, weightsList, minMaxObjs)
+#-------------------------------------------------------------------------------
+# Command line entry point:
+# python lib/optiguide_lib/mainPreprocessing.py --project-dir <path> [--resume]
+def main():
+    result = runPreprocessing(get_project_dir(), resume="--resume" in sys.argv)
+    print("preprocessing: changed specs: " + str(result["changedSpecs"]))
+    print("preprocessing: " + str(result["solves"]) + " solves, timings: " + str(result["timings"]))
+
+if __name__ == "__main__":
+    main()
 
 #-------------------------------------------------------------------------------
@@ -32,6 +32,9 @@ project_dir = get_project_dir()
 
 # PraxisDGMS repo root (system files)
 project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root))
+
+from lib.optiguide_lib import paretoDB as podb
 #-------------------------------------------------------------------------------
 
 # Load user config
@@ -46,10 +49,13 @@ with open(reqSpec_path, "r") as f:
     reqSpec = json.load(f)
 objsSchema = reqSpec["objectives"]["schema"]
 
-# Load paretoDB.json (system file inside PraxisDGMS)
-paretoDB_path = project_root / "lib" / "optiguide_lib" / "paretoDB.json"
-with open(paretoDB_path, "r") as f:
-    paretoDB = json.load(f)
+# Load the paretoDB store (system files inside PraxisDGMS, see paretoDB.openParetoStore)
+paretoDB_path = project_root / "lib" / "optiguide_lib" / podb.paretoStorePath
+paretoDB = podb.openParetoStore(paretoDB_path)
+# settings "uiLayers": the number of dominance layers of paretoDB shown (see paretoDB.paretoLayers);
+# by default only layer 0, i.e., the entries not dominated in all the objectives
+uiLayers = config["settings"].get("uiLayers", 1)
+paretoRows = np.flatnonzero(np.asarray(paretoDB["layer"]) < uiLayers)
 #-------------------------------------------------------------------------------
 
 # System Global Variables
@@ -61,21 +67,20 @@ optimalRec = {}
 # Prepare Pareto optimal graph from the ParetoDB points based on the selected x_axis & y_axis objectives and the current weights.
 def paretoOptimal(paretoDB, objsSchema, x_axis , y_axis, currentWeights):
 
-    # compute the current utility for each point in paretoDB:
-    currentUtility=list()
-    for p in paretoDB:
-        currentUtility.append(round(sum([ p["norm_objectives"][obj] * currentWeights[obj] for obj in p["norm_objectives"] ])/ sum([currentWeights[obj] for obj in p["norm_objectives"]]),3))
+    # compute the current utility for each point in paretoDB, from its columns:
+    weights = np.array([currentWeights[obj] for obj in paretoDB["header"]["norm_objectives"]])
+    currentUtility = np.round(paretoDB["norm_objectives"][paretoRows] @ weights / weights.sum(), 3)
 
     if x_axis=="utility":
         graph_points=pd.DataFrame({
                     x_axis: currentUtility,
-                    y_axis: [p["objectives"][y_axis] for p in paretoDB]
+                    y_axis: podb.storeColumn(paretoDB, "objectives", y_axis)[paretoRows]
                     })
         mask = paretoset(graph_points, sense=["max", objsSchema[y_axis]["minMax"]])
     else:
         graph_points=pd.DataFrame({
-                x_axis: [p["objectives"][x_axis] for p in paretoDB],
-                y_axis: [p["objectives"][y_axis] for p in paretoDB]
+                x_axis: podb.storeColumn(paretoDB, "objectives", x_axis)[paretoRows],
+                y_axis: podb.storeColumn(paretoDB, "objectives", y_axis)[paretoRows]
                 })
         mask = paretoset(graph_points, sense=[objsSchema[x_axis]["minMax"], objsSchema[y_axis]["minMax"]])
 
@@ -96,18 +101,19 @@ def paretoOptimal(paretoDB, objsSchema, x_axis , y_axis, currentWeights):
     paretoIndices=[paretoGraph_points.index[point] for point in range(len(paretoGraph_points))]
     #print(paretoIndices)
 
-    # Retrieve the related data for each Pareto graph point from ParetoDB using the original paretoDB index
+    # Retrieve the related data for each Pareto graph point from ParetoDB using the original paretoDB index;
+    # the solution (input and output) of a point is only read from the store by its row, when its details are shown
     paretoTable_points=[]
     for index in paretoIndices:
+        entry = podb.storeEntry(paretoDB, paretoRows[index], withPayload=False)
         paretoTable_points.append({
-            "index": index,
-            "utility": currentUtility[index],
-            "precomputed_utility": paretoDB[index]["utility"],
-            "weights": paretoDB[index]["weights"],
-            "input": paretoDB[index]["input"],
-            "output": paretoDB[index]["output"],
-            "objectives": paretoDB[index]["objectives"],
-            "norm_objectives": paretoDB[index]["norm_objectives"]
+            "index": entry["index"],
+            "row": paretoRows[index].item(),
+            "utility": currentUtility[index].item(),
+            "precomputed_utility": entry["utility"],
+            "weights": entry["weights"],
+            "objectives": entry["objectives"],
+            "norm_objectives": entry["norm_objectives"]
             })
     #print(paretoTable_points)
 
@@ -343,10 +349,7 @@ class ParetoFrontGUI(QMainWindow):
             fontU.setUnderline(True)
             item.setFont(fontU)
             item.setData(self.DETAILS_ROLE, True)  # Mark this item as having details
-            input_data = currentTable[point]["input"]
-            output_data = currentTable[point]["output"]
-            combined_data = {**output_data, **input_data}  # Merge both dictionaries
-            item.setData(Qt.UserRole, combined_data)
+            item.setData(Qt.UserRole, currentTable[point]["row"])  # paretoDB row of the solution, see show_details_dialog
             self.table.setItem(self.table.rowCount()-3, point, item)
 
             try:
@@ -414,10 +417,14 @@ class ParetoFrontGUI(QMainWindow):
         if not item or not item.data(self.DETAILS_ROLE):
             return  # No item at this cell or not marked for details
 
-        dictionary = item.data(Qt.UserRole)
-        if not dictionary:
+        row = item.data(Qt.UserRole)
+        if row is None:
             return  # No data to show in the dialog
 
+        # Rebuild the solution from the store (see paretoDB.storePayload)
+        solution = podb.storePayload(paretoDB, row)
+        dictionary = {**solution["output"], **solution["input"]}  # Merge both dictionaries
+
         # Create the dialog
         dialog = QDialog(self)
         layout = QVBoxLayout(dialog)
@@ -541,10 +548,7 @@ class ParetoFrontGUI(QMainWindow):
             fontU.setUnderline(True)
             item.setFont(fontU)
             item.setData(self.DETAILS_ROLE, True)  # Mark this item as having details
-            input_data = bestSoFar[point]["input"]
-            output_data = bestSoFar[point]["output"]
-            combined_data = {**output_data, **input_data}  # Merge both dictionaries
-            item.setData(Qt.UserRole, combined_data)
+            item.setData(Qt.UserRole, bestSoFar[point]["row"])  # paretoDB row of the solution, see show_details_dialog
             self.bestSoFar_table.setItem(self.bestSoFar_table.rowCount()-5, point, item)
 
             try:
@@ -766,10 +770,7 @@ class ParetoFrontGUI(QMainWindow):
         fontU.setUnderline(True)
         item.setFont(fontU)
         item.setData(self.DETAILS_ROLE, True)  # Mark this item as having details
-        input_data = optimalRec["point"]["input"]
-        output_data = optimalRec["point"]["output"]
-        combined_data = {**output_data, **input_data}  # Merge both dictionaries
-        item.setData(Qt.UserRole, combined_data)
+        item.setData(Qt.UserRole, optimalRec["point"]["row"])  # paretoDB row of the solution, see show_details_dialog
         self.bestSoFar_table.setItem(self.bestSoFar_table.rowCount()-1, 0, item)
 
         try:
@@ -1,10 +1,17 @@
-import re
 import numpy as np
 import json
-import importlib
 import sys
+import logging
+import math
+import time
+import inspect
+import hashlib
+import shutil
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from scipy.spatial import distance
+from scipy.spatial import cKDTree
+from scipy.spatial import Delaunay
+from scipy.spatial import QhullError
 
 # Add Praxis root to Python path
 project_root = Path(__file__).resolve().parents[2]
@@ -13,94 +20,143 @@ sys.path.insert(0, str(project_root))
 import lib.dgal_lib.dgalPy as dgal
 from lib.vThings.vtOperators.vtFunctions import vtOptimalInstance
 from lib.vThings.vtOperators.vtFunctions import vtOptimalInstanceFromSet
+from lib.vThings.vtOperators.vtFunctions import vtParametricModelSet
+from lib.vThings.vtOperators.vtFunctions import vtOptimalInstanceFromParametricSet
+from lib.vThings.vtOperators.vtFunctions import vtDisjunctiveModel
+from lib.vThings.vtOperators.vtFunctions import vtOptimalInstanceFromDisjunctiveModel
+from lib.vThings.vtOperators.vtFunctions import vtUtilityBound
+from lib.vThings.vtOperators.vtFunctions import vtBoundOrder
+from lib.optiguide_lib.specLoader import (
+    loadJson,
+    extractModel,
+    extractInput,
+    extractMetricSchema,
+    extractObjsSchema,
+    extractObjsFunc,
+    extractConstFunc,
+    specFingerprints
+)
+from lib.optiguide_lib.preprocessingCache import (
+    cacheKey,
+    readCachedLines,
+    cachedLinesWriter,
+    writeCachedLine,
+    closeCachedLines
+)
 
-def get_project_dir():
-    if "--project-dir" in sys.argv:
-        i = sys.argv.index("--project-dir")
-        return Path(sys.argv[i + 1]).resolve()
-    raise SystemExit("Please provide --project-dir <path>")
+# progress of preprocessing, traced as the "dgal" logger (see dgal.startTrace)
+logger = logging.getLogger("dgal.preprocessing")
 
-# Get the project directory
-project_dir = get_project_dir()
+#-------------------------------------------------------------------------------
+# Non-dominated sort of the rows of objectives (one column per objective, of sense
+# "min" or "max"). Returns, per row, its Pareto rank: the number of rows dominating it,
+# and its dominance layer: 0 for the non-dominated rows, and otherwise one more than the
+# highest layer of the rows dominating it. A row can only be dominated by rows before it
+# in lexicographic order (as minimized), so the rows are visited in that order, in blocks:
+# the dominance of a block's rows by all the rows before it is computed at once, and
+# only the layers within the block are resolved row by row.
+def paretoLayers(objectives, senses):
+    F = np.array(objectives, dtype=float).reshape(len(objectives), len(senses))
+    F = F * np.array([1.0 if sense == "min" else -1.0 for sense in senses])
+    order = np.lexsort(F.T[::-1])
+    F = F[order]
+    n = len(F)
+    # bounds the size of the dominance matrices to about 2**24 entries
+    block = max(1, min(256, 2**24 // max(1, n * len(senses))))
+    rank = np.zeros(n, dtype=int)
+    layer = np.zeros(n, dtype=int)
+    for start in range(0, n, block):
+        end = min(start + block, n)
+        # dominators[i, k]: row k dominates row start+i, computed column by column
+        noWorse = np.ones((end - start, end), dtype=bool)
+        better = np.zeros((end - start, end), dtype=bool)
+        for column in F.T:
+            noWorse &= column[None, :end] <= column[start:end, None]
+            better |= column[None, :end] < column[start:end, None]
+        dominators = noWorse & better
+        rank[start:end] = np.count_nonzero(dominators, axis=1)
+        below = np.where(dominators[:, :start], layer[:start] + 1, 0).max(axis=1, initial=0)
+        for i in range(end - start):
+            j = start + i
+            layer[j] = max(below[i], (layer[start:j][dominators[i, start:j]] + 1).max(initial=0))
+    ranks = np.empty_like(rank)
+    layers = np.empty_like(layer)
+    ranks[order] = rank
+    layers[order] = layer
+    return ranks, layers
 
-try:
-    from sklearn_extra.cluster import KMedoids
-except ImportError:
-    from sklearn.cluster import KMeans
-    print("sklearn_extra not found. Using KMeans instead.")
 #-------------------------------------------------------------------------------
 # Unifying entries of initial DB with the similar objectives by applying five steps:
-# 1- sort the entries' list by objective dictionaries using Euclidean distance.
-# 2- group the similar objective dictionaries from the sorted list using Euclidean distance and a specified epsilon.
-# 3- find the representitive weight dictionary for each group using K-Medoids clustering, and get its related objective dictionary.
+# 1- sort the entries by the Euclidean distance of their objectives to the origin.
+# 2- group the entries with similar objectives, using a KD-tree: in sorted order, each entry
+#    not yet grouped starts a new group, of all the entries not yet grouped within uniEpsilon
+#    of it; the groups are numbered in this order, so that their indices are stable.
+# 3- find the representitive entry of each group: the medoid of its weights under the squared
+#    Euclidean distance, i.e., the entry closest to the group's centroid (ties: first in sorted order).
 # 4- use the original index of the representitive data point to extract the associated utility, input and output from the initialDB and generate an entry to the constructed paretoDB.
 # 5- sort the generated paretoDB by weight vectors using Euclidean distance. --> canceled
-def unifyParetoEntries(initialDB, objsSchema, uniEpsilon):
+# 6- add to each entry its Pareto "rank" and dominance "layer" (see paretoLayers), by the
+#    minMax sense of each objective in objsSchema; e.g., the UI loads only layer 0 by default.
+# initialDB is iterated twice, so it may be a list or a re-iterable stream (see CheckpointEntries)
+# templates: optional inputs of the vtSpecs, shared by the solutions in the store (see writeParetoStore)
+def unifyParetoEntries(initialDB, objsSchema, uniEpsilon, templates=None):
     # step#1 >
-    #extract from the initialDB: all objective dictionaries, their related weights, and the index for each
-    entries_list=[{"index": p["index"], "objectives":p["objectives"], "weights":p["weights"]} for p in initialDB]
-    # define the reference point
-    reference_point = [ 0 for i in range(len(objsSchema))]
-    # sort the list of objective dictionaries based on their Euclidean distance to the reference point
-    sorted_list = sorted(entries_list, key=lambda x: distance.euclidean(list(x["objectives"].values()), reference_point))
-    #print(sorted_list)
+    #extract from the initialDB: all objective vectors, their related weights, and the index for each
+    indices = []
+    objectives = []
+    weights = []
+    for p in initialDB:
+        indices.append(p["index"])
+        objectives.append(list(p["objectives"].values()))
+        weights.append(list(p["weights"].values()))
+    objectives = np.array(objectives, dtype=float).reshape(len(indices), -1)
+    # stable, so that entries at the same distance keep their initialDB order
+    order = np.argsort(np.linalg.norm(objectives, axis=1), kind="stable")
+    indices = np.array(indices)[order]
+    objectives = objectives[order]
+    weights = np.array(weights, dtype=float).reshape(len(order), -1)[order]
 
     # step#2 >
-    # define the maximum distance between any pair of objective dictionaries for each group
-    max_distance = uniEpsilon
-    # group the similar objective dictionaries in the sorted list based on the specified maximum distance value and using Euclidean distance
-    groups = []
-    current_group = [sorted_list[0]]
-    for i in range(1, len(sorted_list)):
-        if distance.euclidean(list(sorted_list[i]["objectives"].values()), list(current_group[0]["objectives"].values())) <= max_distance:
-            current_group.append(sorted_list[i])
-        else:
-            groups.append(current_group)
-            current_group = [sorted_list[i]]
-    groups.append(current_group)
-
-    # Debugging >
-    # print the groups of similar objective dictionaries and their weights and original indices
-    # for i, group in enumerate(groups):
-    #    print(f"Group {i+1}:")
-    #    for dict in group:
-    #        print("index:", dict["index"],"| objectives:", dict["objectives"], "| weights:", dict["weights"])
-    #    print()
+    groups = np.full(len(order), -1)
+    nGroups = 0
+    if len(order) > 0:
+        tree = cKDTree(objectives)
+    for i in range(len(order)):
+        if groups[i] >= 0:
+            continue
+        members = np.array(tree.query_ball_point(objectives[i], uniEpsilon))
+        groups[members[groups[members] < 0]] = nGroups
+        nGroups += 1
 
-    paretoDB = []
-    for group in groups:
-        # convert weight dictionaries to numpy array
-        data = np.array([list(d["weights"].values()) for d in group])
+    # step#3 >
+    counts = np.bincount(groups, minlength=nGroups)
+    centroids = np.array([np.bincount(groups, weights[:, j], minlength=nGroups)
+                          for j in range(weights.shape[1])]).T / counts[:, None]
+    spread = np.sum((weights - centroids[groups])**2, axis=1)
+    # by group, then spread, then sorted order; the first of each group is its medoid
+    byGroup = np.lexsort((np.arange(len(order)), spread, groups))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = groups[byGroup][1:] != groups[byGroup][:-1]
+    medoids = indices[byGroup[first]].tolist()
 
-        try:
-            # Try to use KMedoids if available
-            kmedoids = KMedoids(n_clusters=1, metric='euclidean', random_state=0)
-            kmedoids.fit(data)
-            medoid_index = kmedoids.medoid_indices_[0]
-            medoid = group[medoid_index]
-        except NameError:
-            # If KMedoids is not available, use KMeans as a fallback
-            kmeans = KMeans(n_clusters=1, random_state=0)
-            kmeans.fit(data)
-            centroid = kmeans.cluster_centers_[0]
-            # Find the closest point to the centroid
-            medoid_index = np.argmin(np.sum((data - centroid)**2, axis=1))
-            medoid = group[medoid_index]
-
-        original_index = medoid["index"]
-
-        # print("Medoid index:", medoid_index)
-        # print("Medoid:", medoid)
+    # the medoids' initialDB entries, by their index; read in a second pass over
+    # initialDB, so that a streamed initialDB is not loaded as a whole
+    medoidIndices = set(medoids)
+    entriesByIndex = {p["index"]: p for p in initialDB if p["index"] in medoidIndices}
+
+    paretoDB = []
+    for groupIndex, medoid in enumerate(medoids):
+        original_entry = entriesByIndex[medoid]
 
         # step#4 >
         paretoDB.append({
-            "index": groups.index(group),
-            "utility": initialDB[original_index]["utility"],
-            "weights": medoid["weights"],
-            "input": initialDB[original_index]["input"],
-            "output": initialDB[original_index]["output"],
-            "objectives": medoid["objectives"],
-            "norm_objectives": initialDB[original_index]["norm_objectives"]
+            "index": groupIndex,
+            "utility": original_entry["utility"],
+            "weights": original_entry["weights"],
+            "input": original_entry["input"],
+            "output": original_entry["output"],
+            "objectives": original_entry["objectives"],
+            "norm_objectives": original_entry["norm_objectives"]
             })
 
     # step#5 > canceled because all the weight vectors have the same Euclidean ditance
@@ -111,8 +167,144 @@ def unifyParetoEntries(initialDB, objsSchema, uniEpsilon):
     #[p.update({"index":sorted_paretoDB.index(p)}) for p in sorted_paretoDB]
     #paretoDB=sorted_paretoDB
 
-    f = open("paretoDB.json","w")
-    f.write(json.dumps(paretoDB))
+    # step#6 >
+    ranks, layers = paretoLayers([[p["objectives"][obj] for obj in objsSchema] for p in paretoDB],
+                                 [objsSchema[obj]["minMax"] for obj in objsSchema])
+    for p, rank, layer in zip(paretoDB, ranks.tolist(), layers.tolist()):
+        p["rank"] = rank
+        p["layer"] = layer
+
+    writeParetoStore(paretoStorePath, paretoDB, templates)
+
+#-------------------------------------------------------------------------------
+# Columnar paretoDB store, a directory of:
+# - header.json: the number of entries, and the keys of their objectives, norm_objectives and weights
+# - a .npy array per column: index, utility, rank and layer (one value per entry), and
+#   objectives, norm_objectives and weights (one row per entry, one column per key);
+#   openParetoStore memory-maps them, so that they are neither parsed nor boxed
+# - payloads.jsonl: the distinct payloads (input and output) of the entries, one JSON
+#   line each, with its id (see payloadId); payload.npy, the line of the payload of each
+#   entry; and payloadOffsets.npy, the offset of each line (and of the end of the file),
+#   so that the payload of an entry is read on its own (see storePayload)
+# - templates.json: the DGAL input of each vtSpec (its parametersSchema), shared by the
+#   payloads: the input of a payload that is a solution of a template is stored as the
+#   flat values of the template's vars only (see encodePayload), and is rebuilt on demand
+# A paretoDB.json of the previous format, next to the store, is converted on open.
+paretoStorePath = "paretoDB"
+storeScalars = ["index", "utility", "rank", "layer"]
+storeVectors = ["objectives", "norm_objectives", "weights"]
+
+def writeParetoStore(path, paretoDB, templates=None):
+    path = Path(path)
+    # written aside and renamed, so that a store is never partially written
+    tmpPath = path.with_name(path.name + ".tmp")
+    if tmpPath.exists():
+        shutil.rmtree(tmpPath)
+    tmpPath.mkdir(parents=True)
+    header = {"count": len(paretoDB)}
+    for field in storeVectors:
+        header[field] = list(paretoDB[0][field].keys()) if paretoDB else []
+    with open(tmpPath / "header.json", "w") as f:
+        f.write(json.dumps(header))
+    templates = [] if templates is None else templates
+    with open(tmpPath / "templates.json", "w") as f:
+        f.write(json.dumps(templates))
+    indexes = [dgal.varIndex(template) for template in templates]
+    for field in storeScalars:
+        values = [p.get(field, 0) for p in paretoDB]
+        np.save(tmpPath / (field + ".npy"), np.array(values, dtype=float if field == "utility" else int))
+    for field in storeVectors:
+        values = [[p[field][key] for key in header[field]] for p in paretoDB]
+        np.save(tmpPath / (field + ".npy"), np.array(values, dtype=float).reshape(len(paretoDB), len(header[field])))
+    lines = dict()
+    offsets = [0]
+    with open(tmpPath / "payloads.jsonl", "wb") as f:
+        for p in paretoDB:
+            id = payloadId(p)
+            if id not in lines:
+                lines[id] = len(lines)
+                payload = encodePayload(indexes, p)
+                if payload is None:
+                    payload = {"input": p["input"], "output": p["output"]}
+                line = (json.dumps(dict(payload, payload=id)) + "\n").encode()
+                f.write(line)
+                offsets.append(offsets[-1] + len(line))
+    np.save(tmpPath / "payload.npy", np.array([lines[payloadId(p)] for p in paretoDB], dtype=np.int64))
+    np.save(tmpPath / "payloadOffsets.npy", np.array(offsets, dtype=np.int64))
+    if path.exists():
+        shutil.rmtree(path)
+    tmpPath.rename(path)
+
+# returns the store of path: its header, a memory-mapped array per column, and its payloads file
+def openParetoStore(path):
+    path = Path(path)
+    legacyPath = path.with_name(path.name + ".json")
+    if not (path / "header.json").exists() and legacyPath.exists():
+        with open(legacyPath, "r") as f:
+            writeParetoStore(path, json.load(f))
+    with open(path / "header.json", "r") as f:
+        store = {"header": json.load(f)}
+    for field in storeScalars + storeVectors + ["payload", "payloadOffsets"]:
+        store[field] = np.load(path / (field + ".npy"), mmap_mode="r")
+    store["payloads"] = open(path / "payloads.jsonl", "rb")
+    store["templates"] = []
+    if (path / "templates.json").exists():
+        with open(path / "templates.json", "r") as f:
+            store["templates"] = json.load(f)
+    # var index of each template, on first use
+    store["indexes"] = [None for template in store["templates"]]
+    return store
+
+def closeParetoStore(store):
+    store["payloads"].close()
+
+# the column of key (e.g., an objective) of a vector field of the store
+def storeColumn(store, field, key):
+    return store[field][:, store["header"][field].index(key)]
+
+# {"input": ..., "output": ...} of entry i
+def storePayload(store, i):
+    line = store["payload"][i]
+    start, end = store["payloadOffsets"][line], store["payloadOffsets"][line + 1]
+    store["payloads"].seek(start)
+    payload = json.loads(store["payloads"].read(end - start))
+    if "template" not in payload:
+        return {"input": payload["input"], "output": payload["output"]}
+    k = payload["template"]
+    if store["indexes"][k] is None:
+        store["indexes"][k] = dgal.varIndex(store["templates"][k])
+    return {"input": decodeInput(store["indexes"][k], payload), "output": payload["output"]}
+
+# flat encoding {"template", "real", "int", "output"} of a payload, whose input is
+# given by the values of the real and int vars of the first template (as var index,
+# see dgal.varIndex) that it is a solution of (see dgal.gatherVarValues); None if none
+def encodePayload(indexes, payload):
+    for k, index in enumerate(indexes):
+        try:
+            values = dgal.gatherVarValues(index, payload["input"])
+        except (KeyError, IndexError, TypeError):
+            continue    # not a solution of the template
+        encoded = {"template": k, "real": values["real?"], "int": values["int?"], "output": payload["output"]}
+        # the input must also agree with the template outside of its vars
+        if decodeInput(index, encoded) == payload["input"]:
+            return encoded
+    return None
+
+# input of an encoded payload, sharing all but the var paths with the template of index
+def decodeInput(index, encoded):
+    return dgal.scatterVarValues(index, dgal.entryValues(index, encoded["real"], encoded["int"]))
+
+# entry i, as a dict of the paretoDB.json format, with its payload if withPayload
+def storeEntry(store, i, withPayload=True):
+    entry = {field: store[field][i].item() for field in storeScalars}
+    for field in storeVectors:
+        entry[field] = dict(zip(store["header"][field], store[field][i].tolist()))
+    if withPayload:
+        entry.update(storePayload(store, i))
+    return entry
+
+def storeEntries(store, withPayload=True):
+    return [storeEntry(store, i, withPayload) for i in range(store["header"]["count"])]
 
 #-------------------------------------------------------------------------------
 
@@ -129,24 +321,192 @@ def normObjectives(objectives, objsSchema, minMaxObjs):
     return normalizedObjs
 
 #-------------------------------------------------------------------------------
-# Generate optimal Pareto Preprocessing Structure
-def paretoOptimalDB(config, wList, minMaxObjs):
+# Weight regions, to skip redundant solves of the weight sweep.
+# The set of weight vectors for which a solution z* is optimal,
+# {w : w.z* >= w.z for every feasible z}, is a convex cone (also for MIPs, and
+# across vtSpecs). Hence, if some weight vectors all led to the same solution,
+# that solution is optimal for every weight vector in their convex hull, which
+# therefore needs no solve. Weights are compared on the simplex (w / sum(w)),
+# since the utility is scale invariant in w.
+
+# weights dict as a point on the simplex, in objsSchema order
+def simplexWeights(weights, objsSchema):
+    w = np.array([weights[obj] for obj in objsSchema], dtype=float)
+    return w / w.sum()
+
+# solutions are identified by their objectives
+def solutionKey(objectives):
+    return tuple(round(objectives[obj], 9) for obj in objectives)
+
+# regions: {solutionKey: {"entry": entry, "weights": [simplexWeights], "hull": None}}
+def addToWeightRegion(regions, entry, w):
+    key = solutionKey(entry["objectives"])
+    if key not in regions:
+        regions[key] = {"entry": entry, "weights": [], "hull": None}
+    regions[key]["weights"].append(w)
+    regions[key]["hull"] = None
+
+def inWeightRegion(region, w, tol=1e-9):
+    # drop the last coordinate: an affine bijection of the simplex
+    points = np.array(region["weights"])[:, :-1]
+    x = w[:-1]
+    if points.shape[1] == 1:
+        return points.min() - tol <= x[0] <= points.max() + tol
+    if len(points) <= points.shape[1]:
+        return False
+    if region["hull"] is None:
+        try:
+            region["hull"] = Delaunay(points)
+        except QhullError:
+            # degenerate (e.g., collinear) weights do not span a region
+            region["hull"] = False
+    if region["hull"] is False:
+        return False
+    return bool(region["hull"].find_simplex(x) >= 0)
+
+# entry of a solution known to be optimal for w, or None
+def coveringEntry(regions, w):
+    for region in regions.values():
+        if inWeightRegion(region, w):
+            return region["entry"]
+    return None
+
+# coarse-to-fine (farthest point first) order of the weight vectors, so that
+# the early solves span large weight regions and most later ones are covered
+def coarseToFineOrder(wList, objsSchema):
+    points = np.array([simplexWeights(w, objsSchema) for w in wList])
+    order = [0]
+    minDist = np.linalg.norm(points - points[0], axis=1)
+    for _ in range(1, len(points)):
+        nxt = int(np.argmax(minDist))
+        order.append(nxt)
+        minDist = np.minimum(minDist, np.linalg.norm(points - points[nxt], axis=1))
+    return order
+
+#-------------------------------------------------------------------------------
+# Hypervolume convergence monitor of the sweep.
+# The hypervolume of the normalized objectives (maximized, w.r.t. the origin as
+# reference point) is tracked over the non-dominated archive of the entries
+# found; it is updated by the exclusive contribution of each new non-dominated
+# point only. It is computed only when settings "hvThreshold" is set, or when
+# settings "hvTrack" is true (for the hypervolume curve of hypervolume.json).
+# The sweep stops early when the relative hypervolume improvement over the last
+# settings "hvWindow" solves is below settings "hvThreshold", or when the
+# settings "timeBudget" (seconds) runs out; neither is enforced by default.
+
+# non-dominated points of points (maximization)
+def nonDominated(points):
+    front = []
+    for p in sorted(set(points), reverse=True):
+        if not any([all(a >= b for a, b in zip(q, p)) for q in front]):
+            front.append(p)
+    return front
+
+# exact hypervolume of points (maximization, reference point at the origin).
+# Two objectives by a staircase sweep, three by a sweep along the last
+# objective over an incrementally updated 2-D staircase, O(n^2); more
+# objectives by slicing along the last objective down to three
+def hypervolume(points):
+    points = [tuple(p) for p in points if all(x > 0 for x in p)]
+    if not points:
+        return 0.0
+    d = len(points[0])
+    if d == 1:
+        return max([p[0] for p in points])
+    if d == 2:
+        volume = 0.0
+        height = 0.0
+        for x, y in sorted(points, reverse=True):
+            if y > height:
+                volume += x * (y - height)
+                height = y
+        return volume
+    points = sorted(nonDominated(points), key=lambda p: p[-1], reverse=True)
+    volume = 0.0
+    front = []      # non-dominated projections of the points above the slice
+    area = 0.0
+    for k in range(len(points)):
+        q = points[k][:-1]
+        if not any([all(a >= b for a, b in zip(f, q)) for f in front]):
+            front = [f for f in front if not all(a <= b for a, b in zip(f, q))] + [q]
+            area = hypervolume(front)
+        nextLevel = points[k+1][-1] if k+1 < len(points) else 0.0
+        volume += (points[k][-1] - nextLevel) * area
+    return volume
+
+# exclusive hypervolume contribution of z to archive (non-dominated, z not
+# dominated by it): the box of z minus the part of it archive already covers
+def hypervolumeContribution(archive, z):
+    limited = [tuple(min(a, b) for a, b in zip(p, z)) for p in archive]
+    box = 1.0
+    for x in z:
+        box *= x
+    return box - hypervolume(nonDominated(limited))
+
+def newHypervolumeMonitor(settings):
+    return {
+        "archive": [],
+        "hypervolume": 0.0,
+        "curve": [],
+        "solves": 0,
+        "start": time.perf_counter(),
+        "window": settings.get("hvWindow", 50),
+        "threshold": settings.get("hvThreshold"),
+        "timeBudget": settings.get("timeBudget"),
+        "track": settings.get("hvThreshold") is not None or settings.get("hvTrack", False)
+    }
+
+# add entry to the monitor, solved tells whether it cost a solve;
+# returns True if the sweep should stop
+def updateHypervolume(monitor, entry, solved):
+    if monitor["track"]:
+        z = tuple(max(0.0, x) for x in entry["norm_objectives"].values())
+        dominated = any([all(a >= b for a, b in zip(p, z)) for p in monitor["archive"]])
+        if not dominated:
+            monitor["hypervolume"] += hypervolumeContribution(monitor["archive"], z)
+            monitor["archive"] = [p for p in monitor["archive"] if not all(a <= b for a, b in zip(p, z))] + [z]
+    if solved:
+        monitor["solves"] += 1
+    elapsed = time.perf_counter() - monitor["start"]
+    monitor["curve"].append({
+        "step": len(monitor["curve"]),
+        "index": entry["index"],
+        "solves": monitor["solves"],
+        "hypervolume": monitor["hypervolume"] if monitor["track"] else None,
+        "time": elapsed
+        })
+    if monitor["timeBudget"] is not None and elapsed > monitor["timeBudget"]:
+        return True
+    if monitor["threshold"] is not None and solved and monitor["solves"] > monitor["window"]:
+        # hypervolume window solves ago
+        past = [c for c in monitor["curve"] if c["solves"] <= monitor["solves"] - monitor["window"]][-1]
+        improvement = monitor["hypervolume"] - past["hypervolume"]
+        if improvement <= monitor["threshold"] * monitor["hypervolume"]:
+            return True
+    return False
+
+#-------------------------------------------------------------------------------
+# solver of the preprocessing solves, unless settings "solver" is given
+defaultSolver = "gurobi_persistent"
+
+#-------------------------------------------------------------------------------
+# Prepare the context of the weight sweep: load the specs, and the cached
+# optima of each vtSpec; the weights of the models are initialized to initialWeights
+# idealObjectives: optional {vtSpec: {obj: best value over the vtSpec}}, from the
+# payoff table, which bound the utility of each vtSpec (see vtUtilityBound)
+def sweepContext(project_dir, config, minMaxObjs, initialWeights, idealObjectives=None):
 
     # extract objectives schema from reqSpec
-    from lib.optiguide_lib.mainPreprocessing import extractObjsSchema
-    objsSchema = extractObjsSchema(config)
+    objsSchema = extractObjsSchema(project_dir, config)
 
     # extract objectives function from reqSpec
-    from lib.optiguide_lib.mainPreprocessing import extractObjsFunc
-    objsFunc = extractObjsFunc(config)
+    objsFunc = extractObjsFunc(project_dir, config)
 
     # extract constraints function from reqSpec
-    from lib.optiguide_lib.mainPreprocessing import extractConstFunc
-    constFunc = extractConstFunc(config)
+    constFunc = extractConstFunc(project_dir, config)
 
     # Create vtReqSpecNew with the objectives function, constraints replaced
-    with open(project_dir / config["reqSpec"],"r") as f:
-        vtReqSpec = json.load(f)
+    vtReqSpec = loadJson(project_dir, config["reqSpec"])
     vtReqSpecNew = vtReqSpec.copy()
     vtReqSpecNew["objectives"]["function"] = objsFunc
     vtReqSpecNew["constraints"] = constFunc
@@ -156,54 +516,530 @@ def paretoOptimalDB(config, wList, minMaxObjs):
     vtSpecs = config["vtSpecs"]
     for vtSpec_path in vtSpecs:
         # extract model from vtSpec
-        from lib.optiguide_lib.mainPreprocessing import extractModel
-        model = extractModel(vtSpec_path)
+        model = extractModel(project_dir, vtSpec_path)
 
         # extract input from vtSpec
-        from lib.optiguide_lib.mainPreprocessing import extractInput
-        input = extractInput(vtSpec_path)
+        input = extractInput(project_dir, vtSpec_path)
 
         # extract metricSchema from vtSpec
-        from lib.optiguide_lib.mainPreprocessing import extractMetricSchema
-        metricSchema = extractMetricSchema(vtSpec_path)
+        metricSchema = extractMetricSchema(project_dir, vtSpec_path)
 
         # change to vtOptimalInstance, prepare input artifacts
-        with open(project_dir / vtSpec_path,"r") as f:
-            vtSpec = json.load(f)
+        vtSpec = loadJson(project_dir, vtSpec_path)
         # Create vtSpecNew with the model, input fields replaced
         vtSpecNew = vtSpec.copy()
         vtSpecNew["model"] = model
         vtSpecNew["parametersSchema"] = input
         vtSpecNew["metricSchema"] = metricSchema
+        if idealObjectives is not None:
+            vtSpecNew["idealObjectives"] = idealObjectives[vtSpec_path]
 
         vtSpecSet.append(vtSpecNew)
 
-    # Construct initialDB list that contains all possible feasible solutions
-    initialDB = list()
-    for i in range(len(wList)):
+    # utility of the normalized objectives for the given weights; weights may be
+    # numbers or Pyomo params
+    def utility(objectives, weights):
+        normObjs = normObjectives(objectives, objsSchema, minMaxObjs)
+        return sum([ normObjs[obj] * weights[obj] for obj in normObjs]) / sum([weights[obj] for obj in normObjs])
+
+    # The optimum of each vtSpec is cached (see preprocessingCache), keyed by
+    # the fingerprints of the vtSpec and the reqSpec, per utility direction
+    # (see utilityDirection), which does not depend on minMaxObjs
+    settings = config["settings"]
+    fingerprints = specFingerprints(project_dir, config)
+    specCaches = []
+    for vtSpec_path in vtSpecs:
+        key = cacheKey(fingerprints["vtSpecs"][vtSpec_path], fingerprints["reqSpec"])
+        cache = {"results": dict(), "regions": dict(), "infeasible": False,
+                 "writer": cachedLinesWriter(settings, "sweep", key)}
+        for r in readCachedLines(settings, "sweep", key):
+            addSpecOptimum(cache, np.array(r["direction"]), r["optimum"])
+        specCaches.append(cache)
+
+    # The models are built once per vtSpec, with the weights as mutable params,
+    # on the first solve of the vtSpec (see specParametricModel); each keeps a
+    # persistent solver session across the sweep
+    options = {"problemType": "mip", "solver": settings.get("solver", defaultSolver), "debug": True}
+    if "timeLimit" in settings:
+        options["timeLimit"] = settings["timeLimit"]
+
+    return {
+        "objsSchema": objsSchema,
+        "objsFunc": objsFunc,
+        "vtReqSpec": vtReqSpecNew,
+        "vtSpecSet": vtSpecSet,
+        "minMaxObjs": minMaxObjs,
+        "utility": utility,
+        "options": options,
+        "initialWeights": initialWeights,
+        "parametricModels": [None for vtSpec in vtSpecSet],
+        "specCaches": specCaches,
+        "fingerprints": fingerprints,
+        "disjunctive": settings.get("disjunctive", False),
+        "disjunctiveModel": None,
+        "skipCovered": settings.get("skipCoveredWeights", True),
+        "settings": settings
+    }
+
+def closeSweepContext(context):
+    for cache in context["specCaches"]:
+        closeCachedLines(cache["writer"])
 
-        def utility(objectives):
-            normObjs = normObjectives(objectives, objsSchema, minMaxObjs)
-            return sum([ normObjs[obj] * wList[i][obj] for obj in normObjs]) / sum([wList[i][obj] for obj in normObjs])
+# parametric model of the k-th vtSpec of the sweep, built on first use
+def specParametricModel(context, k):
+    if context["parametricModels"][k] is None:
+        context["parametricModels"][k] = vtParametricModelSet([context["vtSpecSet"][k]], context["vtReqSpec"],
+                                                              context["utility"], context["initialWeights"], context["options"])[0]
+    return context["parametricModels"][k]
 
-        optAnswer = vtOptimalInstanceFromSet(vtSpecSet, vtReqSpecNew, utility, options = None)
+# Direction of the utility of weights in the space of the objectives, on the
+# simplex: the normalization of the objectives is affine per objective, so
+# that the optimum of a vtSpec for weights only depends on the direction of
+# w[obj] / (max[obj] - min[obj]) (the sense of each objective is fixed by the
+# reqSpec). Cached optima keyed by direction thus stay valid when minMaxObjs
+# changes, e.g., when another vtSpec changes.
+def utilityDirection(weights, objsSchema, minMaxObjs):
+    d = np.array([weights[obj] / (minMaxObjs[obj]["max"] - minMaxObjs[obj]["min"]) for obj in objsSchema])
+    return d / d.sum()
 
-        optInput = optAnswer["solution"]
-        optOutput = model(optInput)
-        objectives = objsFunc(optOutput)
-        initialDB.append({
-            "index": i,
-            "utility": utility(objectives),
-            "weights": wList[i],
-            "input": optInput,
+# add the optimum of a vtSpec for direction d to its cache; the directions
+# of the same optimum span a weight region of the vtSpec (see coveringEntry),
+# and an infeasible vtSpec is infeasible for every direction
+def addSpecOptimum(cache, d, optimum):
+    if optimum is None:
+        cache["infeasible"] = True
+        return
+    cache["results"][json.dumps(d.tolist())] = optimum
+    addToWeightRegion(cache["regions"], optimum, d)
+
+# optimum {"input", "output", "objectives"} of the k-th vtSpec for weights,
+# or None if infeasible, or if its solve failed (e.g., of settings "timeLimit");
+# solved, unless cached for the utility direction of weights, or for directions
+# around it (in its weight region)
+# cutoff: optional utility to beat; None is then also returned if the vtSpec
+# has no solution of higher utility, which is not cached
+def specOptimum(context, k, weights, cutoff=None):
+    cache = context["specCaches"][k]
+    d = utilityDirection(weights, context["objsSchema"], context["minMaxObjs"])
+    if cache["infeasible"]:
+        return None
+    if json.dumps(d.tolist()) in cache["results"]:
+        return cache["results"][json.dumps(d.tolist())]
+    covering = coveringEntry(cache["regions"], d)
+    if covering is not None:
+        return covering
+
+    p = specParametricModel(context, k)
+    options = context["options"] if cutoff is None else dict(context["options"], cutoff=cutoff)
+    optAnswer = vtOptimalInstanceFromParametricSet([p], context["vtReqSpec"], context["utility"], weights, options)
+    condition = optAnswer["status"]["termination_condition"]
+    # neither a solve under a cutoff, nor a failed solve (e.g., of a time limit,
+    # or unbounded) is cached: the vtSpec is only known to be infeasible if so
+    if condition != "optimal" and (cutoff is not None or condition != "infeasible"):
+        return None
+    if condition != "optimal":
+        optimum = None
+    else:
+        optOutput = optAnswer["output"]
+        optimum = {
+            "input": optAnswer["solution"],
             "output": optOutput,
-            "objectives": objectives,
-            "norm_objectives": normObjectives(objectives, objsSchema, minMaxObjs)
-            })
+            "objectives": context["objsFunc"](optOutput)
+        }
+    addSpecOptimum(cache, d, optimum)
+    writeCachedLine(cache["writer"], {"direction": d.tolist(), "optimum": optimum})
+    return optimum
+
+# optimum {"input", "output", "objectives"} over all vtSpecs for weights, from
+# a single solve of the disjunctive model of the vtSpecs, built on first use
+# (settings "disjunctive"; settings "bigM" is an optional big-M of the disjunction)
+def disjunctiveOptimum(context, weights):
+    if context["disjunctiveModel"] is None:
+        options = dict(context["options"], bigM=context["settings"].get("bigM"))
+        context["disjunctiveModel"] = vtDisjunctiveModel(context["vtSpecSet"], context["vtReqSpec"],
+                                                         context["utility"], context["initialWeights"], options)
+    optAnswer = vtOptimalInstanceFromDisjunctiveModel(context["disjunctiveModel"], weights, context["options"])
+    optOutput = optAnswer["output"]
+    return {
+        "input": optAnswer["solution"],
+        "output": optOutput,
+        "objectives": context["objsFunc"](optOutput)
+    }
+
+#-------------------------------------------------------------------------------
+# initialDB entry of index i for weights, from the optimum of max utility
+# over the vtSpecs; solved, unless the entry of a solution known to be optimal
+# for weights is given as covering. The vtSpecs are visited in decreasing order
+# of their utility bound, and pruned as in vtOptimalInstanceFromSet
+def sweepEntry(context, i, weights, covering=None):
+    objsSchema = context["objsSchema"]
+    minMaxObjs = context["minMaxObjs"]
+    utility = context["utility"]
+    if covering is not None:
+        optimum = covering
+    elif context["disjunctive"]:
+        optimum = disjunctiveOptimum(context, weights)
+    else:
+        optimum = None
+        maxUtility = -float("inf")
+        bounds = [vtUtilityBound(vtSpec, lambda objs: utility(objs, weights)) for vtSpec in context["vtSpecSet"]]
+        for k in vtBoundOrder(bounds):
+            if bounds[k] <= maxUtility:
+                break
+            specOpt = specOptimum(context, k, weights, None if optimum is None else maxUtility)
+            if specOpt is not None and utility(specOpt["objectives"], weights) > maxUtility:
+                maxUtility = utility(specOpt["objectives"], weights)
+                optimum = specOpt
+        if optimum is None:
+            raise Exception("paretoDB: no vtSpec solved to optimality for weights " + str(weights) +
+                            " (infeasible, or out of settings \"timeLimit\")")
+    objectives = optimum["objectives"]
+    return {
+        "index": i,
+        "utility": utility(objectives, weights),
+        "weights": weights,
+        "input": optimum["input"],
+        "output": optimum["output"],
+        "objectives": objectives,
+        "norm_objectives": normObjectives(objectives, objsSchema, minMaxObjs)
+        }
+
+# Adaptive sweep: weightsGenerator yields the next weights, and is sent the
+# norm_objectives of the solution found for them (see mainPreprocessing.adaptiveWeights).
+# Entries are passed to emit as they are solved; doneEntries are the entries of
+# a previous (resumed) run, by index, which are replayed to the generator
+def adaptiveSweep(context, weightsGenerator, weights, emit, doneEntries={}):
+    monitor = newHypervolumeMonitor(context["settings"])
+    count = 0
+    solvesBefore = dgal.stats["solves"]
+    while True:
+        # entries replayed from a resumed run cost no solve
+        solved = count not in doneEntries
+        if solved:
+            entry = sweepEntry(context, count, weights)
+            emit(entry)
+        else:
+            entry = doneEntries[count]
+        count += 1
+        if updateHypervolume(monitor, entry, solved):
+            break
+        try:
+            weights = weightsGenerator.send(entry["norm_objectives"])
+        except StopIteration:
+            break
+    return {"count": count, "solves": dgal.stats["solves"] - solvesBefore, "hypervolumeCurve": monitor["curve"]}
+
+#-------------------------------------------------------------------------------
+# Solve the weight sweep for indexedWeights, a list of (index, weights) pairs;
+# weight vectors inside the region of an already found solution are
+# not solved (see coveringEntry), unless settings "skipCoveredWeights" is false.
+# The weight vectors are visited coarse-to-fine, and the sweep may stop early
+# (see updateHypervolume), so that some weight vectors have no entry.
+# Entries are passed to emit as they are found. doneEntries are the entries
+# of a previous (resumed) run, which seed the weight regions and the
+# hypervolume monitor, and whose weight vectors are skipped
+# returns {"solves": number of DGAL solves, "hypervolumeCurve": the hypervolume after each entry}
+def sweepWeights(context, indexedWeights, emit, doneEntries=()):
+    objsSchema = context["objsSchema"]
+    skipCovered = context["skipCovered"]
+    monitor = newHypervolumeMonitor(context["settings"])
+
+    regions = dict()
+    done = set()
+    for entry in doneEntries:
+        done.add(entry["index"])
+        if skipCovered:
+            addToWeightRegion(regions, entry, simplexWeights(entry["weights"], objsSchema))
+        updateHypervolume(monitor, entry, False)
+
+    indexedWeights = [(i, weights) for (i, weights) in indexedWeights if i not in done]
+    weightsOnly = [weights for (i, weights) in indexedWeights]
+    solvesBefore = dgal.stats["solves"]
+    for k in coarseToFineOrder(weightsOnly, objsSchema) if indexedWeights else []:
+        i, weights = indexedWeights[k]
+
+        w = simplexWeights(weights, objsSchema)
+        covering = coveringEntry(regions, w) if skipCovered else None
+        entry = sweepEntry(context, i, weights, covering)
+        emit(entry)
+        if skipCovered:
+            addToWeightRegion(regions, entry, w)
+        if updateHypervolume(monitor, entry, covering is None):
+            break
+
+    return {"solves": dgal.stats["solves"] - solvesBefore, "hypervolumeCurve": monitor["curve"]}
+
+#-------------------------------------------------------------------------------
+# Parallel sweep: each process of the pool builds its sweep context once,
+# in initSweepWorker, and then solves chunks of weight vectors
+sweepWorkerContext = None
+
+# settings "trace": optional arguments of dgal.startTrace, e.g.
+# {"level": "INFO", "solverLog": true}; each worker traces to its own file
+def startSettingsTrace(settings, worker=False):
+    if "trace" in settings:
+        dgal.startTrace(**settings["trace"], perProcess=worker)
+
+def initSweepWorker(project_dir, config, minMaxObjs, initialWeights, idealObjectives):
+    global sweepWorkerContext
+    startSettingsTrace(config["settings"], worker=True)
+    sweepWorkerContext = sweepContext(project_dir, config, minMaxObjs, initialWeights, idealObjectives)
+
+# solves a chunk (indexedWeights, doneEntries); returns the chunk entries, and
+# the number of DGAL solves of the worker, to be added to dgal.stats of the main process
+def sweepWorkerChunk(chunk):
+    indexedWeights, doneEntries = chunk
+    entries = []
+    result = sweepWeights(sweepWorkerContext, indexedWeights, entries.append, doneEntries)
+    result["entries"] = entries
+    return result
+
+# Split indexedWeights into contiguous chunks, a few per worker for load balancing;
+# the chunks (and so the skipped solves within each) do not depend on scheduling.
+# Weight regions are not shared across chunks, so that a parallel sweep skips
+# fewer covered weight vectors than a sequential one (e.g., 98 solves with 2
+# workers instead of 64 on the procurement example with alpha_entries 10);
+# larger chunks let more weight vectors be covered by the regions of their chunk
+def sweepChunks(indexedWeights, workers, chunksPerWorker=2):
+    chunkSize = max(1, math.ceil(len(indexedWeights) / (workers * chunksPerWorker)))
+    return [indexedWeights[k:k+chunkSize] for k in range(0, len(indexedWeights), chunkSize)]
+
+#-------------------------------------------------------------------------------
+# Checkpoint of the sweep: each initialDB entry is appended to initialDB.jsonl
+# as soon as it is found, and then its index to initialDB.manifest.jsonl, whose
+# first line identifies the sweep (weights, specs and minMaxObjs). An entry
+# counts as done only once it is in the manifest, so a partially written
+# entry of an interrupted run is ignored, and solved again on resume.
+# The payload {"input", "output"} of an entry is stored once per distinct
+# payload, in initialDB.payloads.jsonl, and referenced by its id (see payloadId),
+# since many weight vectors share the same optimal solution.
+checkpointFile = "initialDB.jsonl"
+manifestFile = "initialDB.manifest.jsonl"
+payloadsFile = "initialDB.payloads.jsonl"
+
+# identity of the sweep, to check that a resumed checkpoint belongs to it;
+# an adaptive sweep is identified by its generator and the arguments it was
+# created with (e.g., mainPreprocessing.adaptiveWeights and its epsilon), so it
+# must not have been started yet
+def sweepHeader(project_dir, config, wList, minMaxObjs):
+    if inspect.isgenerator(wList):
+        weights = {
+            "generator": wList.__qualname__,
+            "arguments": hashlib.sha256(json.dumps(inspect.getgeneratorlocals(wList),
+                                                   sort_keys=True, default=str).encode()).hexdigest()
+        }
+    else:
+        weights = hashlib.sha256(json.dumps(wList).encode()).hexdigest()
+    return {
+        "weights": weights,
+        "reqSpec": config["reqSpec"],
+        "vtSpecs": config["vtSpecs"],
+        "fingerprints": specFingerprints(project_dir, config),
+        "minMaxObjs": minMaxObjs
+    }
+
+# header and done indices of the checkpoint manifest, or None if there is none
+def readManifest():
+    if not Path(manifestFile).exists() or not Path(checkpointFile).exists():
+        return None
+    with open(manifestFile, "r") as f:
+        lines = f.read().splitlines()
+    if not lines:
+        return None
+    done = set()
+    for line in lines[1:]:
+        try:
+            done.add(json.loads(line)["index"])
+        except ValueError:
+            pass    # partially written last line
+    return {"header": json.loads(lines[0]), "done": done}
+
+# open the checkpoint; if resume, keep the entries of a previous run of the same sweep
+def openCheckpoint(header, resume):
+    header = json.loads(json.dumps(header))
+    manifest = readManifest() if resume else None
+    if manifest is not None and manifest["header"] != header:
+        raise Exception("paretoOptimalDB: checkpoint " + manifestFile + " belongs to a different sweep, cannot resume")
+    if manifest is None:
+        manifest = {"header": header, "done": set()}
+        with open(manifestFile, "w") as f:
+            f.write(json.dumps(header) + "\n")
+        open(checkpointFile, "w").close()
+        open(payloadsFile, "w").close()
+    else:
+        # the lines appended on resume must not continue a partially written line
+        for path in [checkpointFile, manifestFile, payloadsFile]:
+            truncatePartialLine(path)
+    return {
+        "done": manifest["done"],
+        "entries": open(checkpointFile, "a"),
+        "manifest": open(manifestFile, "a"),
+        "payloads": open(payloadsFile, "a"),
+        "payloadIds": set(payloadOffsets())
+    }
+
+# truncate the file of path after its last newline, i.e., drop a partially
+# written last line of an interrupted run
+def truncatePartialLine(path, blockSize=4096):
+    if not Path(path).exists():
+        return
+    with open(path, "rb+") as f:
+        end = f.seek(0, 2)
+        while end > 0:
+            start = max(0, end - blockSize)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+# content address of the payload {"input", "output"} of an entry
+def payloadId(entry):
+    return cacheKey(entry["input"], entry["output"])
+
+# file offset of each payload of the checkpoint, by id
+def payloadOffsets():
+    offsets = dict()
+    if not Path(payloadsFile).exists():
+        return offsets
+    with open(payloadsFile, "rb") as f:
+        offset = 0
+        for line in f:
+            try:
+                offsets.setdefault(json.loads(line)["payload"], offset)
+            except ValueError:
+                pass    # partially written payload
+            offset += len(line)
+    return offsets
+
+# the payload is written before the entry that references it
+def writeCheckpointEntry(checkpoint, entry):
+    id = payloadId(entry)
+    if id not in checkpoint["payloadIds"]:
+        checkpoint["payloads"].write(json.dumps({"payload": id, "input": entry["input"], "output": entry["output"]}) + "\n")
+        checkpoint["payloads"].flush()
+        checkpoint["payloadIds"].add(id)
+    entry = {key: value for key, value in entry.items() if key not in ["input", "output"]}
+    entry["payload"] = id
+    checkpoint["entries"].write(json.dumps(entry) + "\n")
+    checkpoint["entries"].flush()
+    checkpoint["manifest"].write(json.dumps({"index": entry["index"]}) + "\n")
+    checkpoint["manifest"].flush()
+    checkpoint["done"].add(entry["index"])
+
+def closeCheckpoint(checkpoint):
+    checkpoint["entries"].close()
+    checkpoint["manifest"].close()
+    checkpoint["payloads"].close()
+
+# Re-iterable stream of the done initialDB entries of the checkpoint, in index
+# order, read line by line, so that the initialDB is never loaded as a whole.
+# Entries are appended in solve order (coarse-to-fine, and per chunk of a
+# parallel sweep), so that a first pass only collects the file offset of each
+# entry, and a second pass reads them in index order. The payload of each
+# entry is read by its id; entries of the same payload share it, and the
+# last payloadCacheSize payloads read are kept
+class CheckpointEntries:
+    payloadCacheSize = 1024
+
+    def __init__(self, done):
+        self.done = done
+
+    def __iter__(self):
+        offsets = dict()
+        with open(checkpointFile, "rb") as f:
+            offset = 0
+            for line in f:
+                try:
+                    index = json.loads(line)["index"]
+                except ValueError:
+                    index = None    # partially written entry
+                if index in self.done and index not in offsets:
+                    offsets[index] = offset
+                offset += len(line)
+            payloadsAt = payloadOffsets()
+            payloads = dict()
+            with open(payloadsFile, "rb") as pf:
+                for index in sorted(offsets):
+                    f.seek(offsets[index])
+                    entry = json.loads(f.readline())
+                    # entries of checkpoints of previous versions hold their payload
+                    if "payload" in entry:
+                        id = entry.pop("payload")
+                        if id not in payloads:
+                            if len(payloads) >= self.payloadCacheSize:
+                                payloads.clear()
+                            pf.seek(payloadsAt[id])
+                            payload = json.loads(pf.readline())
+                            payloads[id] = {"input": payload["input"], "output": payload["output"]}
+                        entry.update(payloads[id])
+                    yield entry
+
+#-------------------------------------------------------------------------------
+# Generate optimal Pareto Preprocessing Structure
+# wList is either a list of weights, or an adaptive weights generator, which is
+# run sequentially (see adaptiveSweep)
+# settings "workers" > 1 runs the weight sweep on a pool of that many processes,
+# at the cost of more solves of covered weight vectors (see sweepChunks)
+# The initialDB entries are streamed from the checkpoint in index order
+# (see CheckpointEntries), whatever the order they were solved in
+# resume continues the sweep of a previous run from its checkpoint
+# idealObjectives: optional ideal objectives of each vtSpec, to prune the
+# vtSpecs that cannot beat the incumbent of a weight vector (see sweepEntry)
+def paretoOptimalDB(project_dir, config, wList, minMaxObjs, resume=False, idealObjectives=None):
+
+    # extract objectives schema from reqSpec
+    objsSchema = extractObjsSchema(project_dir, config)
+
+    checkpoint = openCheckpoint(sweepHeader(project_dir, config, wList, minMaxObjs), resume)
+    doneEntries = CheckpointEntries(set(checkpoint["done"]))
+    emit = lambda entry: writeCheckpointEntry(checkpoint, entry)
+
+    # Construct initialDB that contains all possible feasible solutions
+    workers = config["settings"].get("workers", 1)
+    if inspect.isgenerator(wList):
+        weights = next(wList)
+        context = sweepContext(project_dir, config, minMaxObjs, weights, idealObjectives)
+        done = {entry["index"]: entry for entry in doneEntries}
+        results = [adaptiveSweep(context, wList, weights, emit, done)]
+        closeSweepContext(context)
+        count = results[0]["count"]
+    elif workers > 1:
+        indexedWeights = list(enumerate(wList))
+        chunks = sweepChunks(indexedWeights, workers)
+        chunkOf = {i: c for c, chunk in enumerate(chunks) for (i, weights) in chunk}
+        chunkDoneEntries = [[] for chunk in chunks]
+        for entry in doneEntries:
+            chunkDoneEntries[chunkOf[entry["index"]]].append(entry)
+        with ProcessPoolExecutor(max_workers=workers, initializer=initSweepWorker,
+                                 initargs=(project_dir, config, minMaxObjs, wList[0], idealObjectives)) as pool:
+            results = []
+            for result in pool.map(sweepWorkerChunk, zip(chunks, chunkDoneEntries)):
+                for entry in result.pop("entries"):
+                    emit(entry)
+                results.append(result)
+        dgal.stats["solves"] += sum([r["solves"] for r in results])
+        count = len(wList)
+    else:
+        context = sweepContext(project_dir, config, minMaxObjs, wList[0], idealObjectives)
+        results = [sweepWeights(context, list(enumerate(wList)), emit, doneEntries)]
+        closeSweepContext(context)
+        count = len(wList)
+    closeCheckpoint(checkpoint)
+    solves = sum([r["solves"] for r in results])
+
+    logger.info("paretoOptimalDB: %d solves for %d weight vectors, %d entries",
+                solves, count, len(checkpoint["done"]))
 
-    f = open("initialDB.json","w")
-    f.write(json.dumps(initialDB))
+    # hypervolume curve per sweep (one per chunk of a parallel sweep)
+    f = open("hypervolume.json","w")
+    f.write(json.dumps([r["hypervolumeCurve"] for r in results]))
 
-    unifyParetoEntries(initialDB, objsSchema, config["settings"]["unifyObjs_epsilon"])
+    # the initialDB is streamed from the checkpoint
+    initialDB = CheckpointEntries(checkpoint["done"])
+    templates = [extractInput(project_dir, vtSpec_path) for vtSpec_path in config["vtSpecs"]]
+    unifyParetoEntries(initialDB, objsSchema, config["settings"]["unifyObjs_epsilon"], templates)
 
 #-------------------------------------------------------------------------------
@@ -0,0 +1,92 @@
+import os
+import sys
+import json
+import hashlib
+from pathlib import Path
+
+# Get the PRAXIS DGMS root directory
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root))  # add repo root to Python path
+
+#-------------------------------------------------------------------------------
+# Cache of preprocessing results, for incremental preprocessing.
+# Results are stored per vtSpec in the directory of settings "cacheDir"
+# (default "preprocessingCache", next to the other outputs), keyed by cacheKey
+# of everything they depend on, e.g. the fingerprints of the vtSpec and the
+# reqSpec (see specLoader.specFingerprints). Hence, a result is reused as long
+# as the specs it depends on do not change. settings "incremental": false
+# disables the cache.
+
+# key of a cached result, from the (JSON) values it depends on
+def cacheKey(*parts):
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+def cacheEnabled(settings):
+    return settings.get("incremental", True)
+
+def cachePath(settings, name):
+    path = Path(settings.get("cacheDir", "preprocessingCache"))
+    path.mkdir(parents=True, exist_ok=True)
+    return path / name
+
+#-------------------------------------------------------------------------------
+# Single cached values, one JSON file per key
+
+# returns the cached value of name and key, or None
+def readCached(settings, name, key):
+    if not cacheEnabled(settings):
+        return None
+    path = cachePath(settings, name + "_" + key + ".json")
+    if not path.exists():
+        return None
+    with open(path, "r") as f:
+        return json.load(f)
+
+def writeCached(settings, name, key, value):
+    if not cacheEnabled(settings):
+        return
+    path = cachePath(settings, name + "_" + key + ".json")
+    # write and rename, so that a cached value is never partially written
+    tmpPath = path.with_name(path.name + "." + str(os.getpid()) + ".tmp")
+    with open(tmpPath, "w") as f:
+        f.write(json.dumps(value))
+    os.replace(tmpPath, path)
+
+#-------------------------------------------------------------------------------
+# Cached records, appended one JSON line at a time, as they are computed.
+# Each process appends to its own file, so that the workers of a parallel
+# sweep do not interleave their lines.
+
+# returns the records of name and key, of all processes
+def readCachedLines(settings, name, key):
+    records = []
+    if not cacheEnabled(settings):
+        return records
+    for path in sorted(cachePath(settings, "").glob(name + "_" + key + ".*.jsonl")):
+        with open(path, "r") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    pass    # partially written record
+    return records
+
+# returns a writer of the records of name and key, for writeCachedLine
+def cachedLinesWriter(settings, name, key):
+    return {"settings": settings, "name": name, "key": key, "file": None}
+
+def writeCachedLine(writer, record):
+    if not cacheEnabled(writer["settings"]):
+        return
+    if writer["file"] is None:
+        path = cachePath(writer["settings"], writer["name"] + "_" + writer["key"] + "." + str(os.getpid()) + ".jsonl")
+        writer["file"] = open(path, "a")
+    writer["file"].write(json.dumps(record) + "\n")
+    writer["file"].flush()
+
+def closeCachedLines(writer):
+    if writer["file"] is not None:
+        writer["file"].close()
+        writer["file"] = None
+
+#-------------------------------------------------------------------------------
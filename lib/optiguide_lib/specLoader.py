@@ -0,0 +1,133 @@
+import re
+import sys
+import json
+import hashlib
+import importlib.util
+from pathlib import Path
+
+# Get the PRAXIS DGMS root directory
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root))  # add repo root to Python path
+
+#-------------------------------------------------------------------------------
+# Project specs loading, shared by the preprocessing phases.
+# All paths are relative to the project directory (project_dir).
+
+# Load a JSON file of the project
+def loadJson(project_dir, path):
+    with open(Path(project_dir) / path,"r") as f:
+        return json.load(f)
+
+# modules loaded by loadFunction, keyed by their file path, so that
+# each project module is executed only once per process
+loadedModules = {}
+
+# Load the function referenced by functionRef, e.g. "analyticModels/modelAM.py:am"
+def loadFunction(project_dir, functionRef):
+    module_path = functionRef.replace('/', '.')
+    module_path = re.sub(r'^\.+', '', module_path)
+    module_name, function_name = module_path.rsplit(':', 1)
+
+    # Remove the '.py' from the module name if it's there
+    if module_name.endswith('.py'):
+        module_name = module_name[:-3]
+
+    file_path = (Path(project_dir) / functionRef.split(':')[0]).resolve()
+    if file_path not in loadedModules:
+        # Use importlib.util to load the module
+        spec = importlib.util.spec_from_file_location(module_name, file_path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        spec.loader.exec_module(module)
+        loadedModules[file_path] = module
+
+    return getattr(loadedModules[file_path], function_name)
+
+#-------------------------------------------------------------------------------
+# Extract model from vtSpec
+def extractModel(project_dir, vtSpec_path):
+    vtSpec = loadJson(project_dir, vtSpec_path)
+    return loadFunction(project_dir, vtSpec["model"]["@functionRef"])
+
+#-------------------------------------------------------------------------------
+# Extract input from vtSpec
+def extractInput(project_dir, vtSpec_path):
+    vtSpec = loadJson(project_dir, vtSpec_path)
+    return loadJson(project_dir, vtSpec["parametersSchema"])
+
+#-------------------------------------------------------------------------------
+# Extract metricSchema from vtSpec
+def extractMetricSchema(project_dir, vtSpec_path):
+    vtSpec = loadJson(project_dir, vtSpec_path)
+    return loadJson(project_dir, vtSpec["metricSchema"])
+
+#-------------------------------------------------------------------------------
+# Extract objectives schema from reqSpec
+def extractObjsSchema(project_dir, config):
+    reqSpec = loadJson(project_dir, config["reqSpec"])
+    return reqSpec["objectives"]["schema"]
+
+#-------------------------------------------------------------------------------
+# Extract objectives function from reqSpec
+def extractObjsFunc(project_dir, config):
+    reqSpec = loadJson(project_dir, config["reqSpec"])
+    return loadFunction(project_dir, reqSpec["objectives"]["function"]["@functionRef"])
+
+#-------------------------------------------------------------------------------
+# Extract constraints function from reqSpec
+def extractConstFunc(project_dir, config):
+    reqSpec = loadJson(project_dir, config["reqSpec"])
+    return loadFunction(project_dir, reqSpec["constraints"]["@functionRef"])
+
+#-------------------------------------------------------------------------------
+# Load the project config
+def loadConfig(project_dir):
+    return loadJson(project_dir, Path("configs") / "config.json")
+
+#-------------------------------------------------------------------------------
+# Spec fingerprints, for incremental preprocessing: the content hash of a spec
+# and of the files it references, so that the results of a spec are reused
+# as long as its fingerprint does not change.
+# Note that only the module referenced by a @functionRef is hashed, not the
+# modules it imports.
+
+# content hash of the files at paths, relative to the project directory
+def filesFingerprint(project_dir, paths):
+    fingerprint = hashlib.sha256()
+    for path in paths:
+        fingerprint.update(str(path).encode())
+        with open(Path(project_dir) / path, "rb") as f:
+            fingerprint.update(f.read())
+    return fingerprint.hexdigest()
+
+# file of the module of a functionRef, e.g. "analyticModels/modelAM.py"
+def functionRefFile(functionRef):
+    return functionRef.split(':')[0]
+
+# fingerprint of a vtSpec: the vtSpec, its AM source, its parameters and metric schemas
+def vtSpecFingerprint(project_dir, vtSpec_path):
+    vtSpec = loadJson(project_dir, vtSpec_path)
+    return filesFingerprint(project_dir, [
+        vtSpec_path,
+        functionRefFile(vtSpec["model"]["@functionRef"]),
+        vtSpec["parametersSchema"],
+        vtSpec["metricSchema"]
+    ])
+
+# fingerprint of the reqSpec of config: the reqSpec, and the sources of its
+# objectives and constraints functions
+def reqSpecFingerprint(project_dir, config):
+    reqSpec = loadJson(project_dir, config["reqSpec"])
+    return filesFingerprint(project_dir, [
+        config["reqSpec"],
+        functionRefFile(reqSpec["objectives"]["function"]["@functionRef"]),
+        functionRefFile(reqSpec["constraints"]["@functionRef"])
+    ])
+
+# fingerprints of the specs of config:
+# {"reqSpec": fingerprint, "vtSpecs": {vtSpec path: fingerprint}}
+def specFingerprints(project_dir, config):
+    return {
+        "reqSpec": reqSpecFingerprint(project_dir, config),
+        "vtSpecs": {vtSpec: vtSpecFingerprint(project_dir, vtSpec) for vtSpec in config["vtSpecs"]}
+    }
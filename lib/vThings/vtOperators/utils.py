@@ -7,6 +7,7 @@ import importlib
 import importlib.util
 import sys
 import json
+import logging
 import copy
 import re
 import numbers
@@ -18,6 +19,9 @@ sys.path.insert(0, str(project_root))
 
 from lib.dgal_lib import dgalPy as dgal
 
+# traced as the "vThings" logger, see dgal.startTrace
+logger = logging.getLogger("vThings.utils")
+
 #-------------------------------------------------------------------------------
 
 # instantiator
@@ -152,11 +156,11 @@ def instantiator(input):
         elif type(v)==str:
             if "@ref" in k:
                 # a sub key in v is @ref
-                print(f"@ref in {k}, path {v}")
+                logger.debug("@ref in %s, path %s", k, v)
                 dir = input[k]
                 #do not modify original object
                 dir = project_root + '/' + dir
-                print("dir get: "+dir)
+                logger.debug("dir get: %s", dir)
                 file = dir + ".json"
                 with open(file, 'r') as f:
                     data = json.load(f)
@@ -255,7 +259,7 @@ def getValueByPath(data, path):
             try:
                 return getValueByPath(data[path[0]], path[1:])
             except:
-                print("Value Key or Index Warning at: "+str(path)+ " in "+ str(data))
+                logger.warning("Value Key or Index Warning at: %s in %s", path, data)
                 return data[path[0]]
                 #return None
         # else atomic value, return data if number
@@ -264,14 +268,14 @@ def getValueByPath(data, path):
             return data
         # return None for non-numeric data
         else:
-            print(str(data)+" is not number")
+            logger.debug("%s is not number", data)
             return None
     # non recursive structure, return data if number, else None
     else:
         if isinstance(data, numbers.Number):
             return data
         else:
-            print(str(data)+" is not number")
+            logger.debug("%s is not number", data)
             return data
             #return None
 
@@ -295,7 +299,7 @@ def pathGenerator(d, currentPath, pathList):
             # if v is a dict or list, append key and iterate
             if isinstance(v, (dict, list)):
                 p.append(k)
-                print ("p: ",str(p))
+                logger.debug("p: %s", p)
                 pathGenerator(v, p, pathList)
             # else v is data, append key to p
             else:
@@ -303,14 +307,14 @@ def pathGenerator(d, currentPath, pathList):
                 # after each loop finishes by reaching data,
                 # append data path to pathList
                 pathList.append(p)
-            print ("pathList: ",str(pathList))
+            logger.debug("pathList: %s", pathList)
     elif isinstance(d, list):
         for i in range(len(d)):
             p = copy.deepcopy(currentPath)
             # if v is a dict or list, append key and iterate
             if isinstance(d[i], (dict, list)):
                 p.append(i)
-                print ("p: ",str(p))
+                logger.debug("p: %s", p)
                 pathGenerator(d[i], p, pathList)
             # else v is data, append key to p
             else:
@@ -318,7 +322,7 @@ def pathGenerator(d, currentPath, pathList):
                 # after each loop finishes by reaching data,
                 # append data path to pathList
                 pathList.append(p)
-            print ("pathList: ",str(pathList))
+            logger.debug("pathList: %s", pathList)
     else:
         return pathList
     return pathList
@@ -369,7 +373,7 @@ def aggregator(metricSchema, metricList):
     metricDict = copy.deepcopy(metricSchema)
     rsDict = copy.deepcopy(metricSchema)
 
-    print("metricDict: "+ json.dumps(metricDict) + "\n")
+    logger.debug("metricDict: %s", metricDict)
 
     pathList = []
     currentPath = []
@@ -609,7 +613,7 @@ def extractConstraintsByPath(data, path):
         try:
             return extractConstraintsByPath(data[path[0]], path[1:])
         except:
-            print("Const Key or Index Error at: "+str(path) + " in "+ str(data))
+            logger.warning("Const Key or Index Error at: %s in %s", path, data)
             return None
     # else atomic value, no constraint
     elif isinstance(data, dict):
@@ -621,7 +625,7 @@ def extractConstraintsByPath(data, path):
         raise Exception("No bound found!")
     # return None for non-numeric data
     else:
-        print(str(data)+" is not valid path!")
+        logger.warning("%s is not valid path!", data)
         return None
 
 # metricSchema validator
@@ -639,8 +643,8 @@ def metricSchemaConstraintsDict(ms, rsDict={}):
             for k1, v1 in v.items():
                 if isinstance(v1, dict) and ("lb" in v1 or "ub" in v1):
                     rsDict[k][k1]=v1
-                    print("k: "+k+", k1: "+k1)
-                    print(str(rsDict))
+                    logger.debug("k: %s, k1: %s", k, k1)
+                    logger.debug("%s", rsDict)
             if "components" in v:
                 for k2, v2 in v["components"].items():
                     metricSchemaConstraintsDict(v2, rsDict=rsDict)
@@ -659,11 +663,11 @@ def metricSchemaConstraints(ms, o, pathList, rsDict={}):
             #print("m const: "+str(constraint["lb"]))
             #print("o: "+ str(o)+" path: "+str(path))
             res = (getValueByPath(o, path) >= constraint["lb"])
-            print("msc res: "+str(res))
+            logger.debug("msc res: %s", res)
             result = dgal.all([result, res])
         if "ub" in constraint:
             res = (getValueByPath(o, path) <= constraint["ub"])
-            print("msc res: "+str(res))
+            logger.debug("msc res: %s", res)
             result = dgal.all([result, res])
 
         constraintsList.append(result)
@@ -688,11 +692,11 @@ def objSchemaConstraints(objSchemaAndBounds, o, objPathList, rsDict={}):
             #print("obj const: "+str(constraint["lb"]))
             #print("o: "+ str(o)+" path: "+str(path))
             res = (getValueByPath(o, path) >= constraint["lb"])
-            print("osc res: "+str(res))
+            logger.debug("osc res: %s", res)
             result = dgal.all([result, res])
         if "ub" in constraint:
             res = (getValueByPath(o, path) <= constraint["ub"])
-            print("osc res: "+str(res))
+            logger.debug("osc res: %s", res)
             result = dgal.all([result, res])
 
         constraintsList.append(result)
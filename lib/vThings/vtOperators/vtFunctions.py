@@ -2,6 +2,7 @@
 import sys
 import copy
 import json
+import logging
 import importlib.util
 from pathlib import Path
 
@@ -38,6 +39,12 @@ from lib.vThings.vtOperators.utils import (
 
 from lib.dgal_lib import dgalPy as dgal
 
+# traced as the "vThings" logger, see dgal.startTrace
+logger = logging.getLogger("vThings.vtFunctions")
+
+# default DGAL options, used when options are not provided
+defaultOptions = {"problemType": "mip", "solver":"gurobi_direct","debug": True}
+
 #-------------------------------------------------------------------------------
 
 # helper functions to construct bound constraints
@@ -46,13 +53,13 @@ def constructBoundConstraints(schemaAndBounds, input, constraints=[]):
     # exit case, dgal type structure
     def atomicBoundConstraint(atomicSchema, atomicInput):
         constraints = True
-        print("atomicBoundConstraint atomicSchema: "+str(atomicSchema))
-        print("atomicBoundConstraint atomicInput: "+str(atomicInput))
+        logger.debug("atomicBoundConstraint atomicSchema: %s", atomicSchema)
+        logger.debug("atomicBoundConstraint atomicInput: %s", atomicInput)
         if "lb" in atomicSchema:
             constraints = dgal.all([constraints, atomicInput >= atomicSchema["lb"]])
         if "ub" in atomicSchema:
             constraints = dgal.all([constraints, atomicInput <= atomicSchema["ub"]])
-        print("atomicBoundConstraint constraints: "+str(constraints))
+        logger.debug("atomicBoundConstraint constraints: %s", constraints)
         return constraints
 
     def isDgalType(input):
@@ -84,9 +91,18 @@ def constructBoundConstraints(schemaAndBounds, input, constraints=[]):
 # wrapper function to construct bound constraints
 def boundConstraints(schemaAndBounds, input):
     constraints = constructBoundConstraints(schemaAndBounds, input, [])
-    print("boundConstraints constraints: "+str(constraints))
+    logger.debug("boundConstraints constraints: %s", constraints)
     return constraints
 
+# constraints of the model output o required by vtReqSpec: its constraints
+# function if loaded (see paretoDB.sweepContext), else o["constraints"].
+# The payoff table of mainPreprocessing is built with the same function, so
+# that its ideal objectives bound the utility of each vtSpec (see vtUtilityBound)
+def reqConstraints(vtReqSpec, o):
+    if callable(vtReqSpec.get("constraints")):
+        return vtReqSpec["constraints"](o)
+    return o["constraints"]
+
 #-------------------------------------------------------------------------------
 
 # find optimal vt instance
@@ -112,7 +128,7 @@ def vtOptimalInstance(vtSpec, vtReqSpec, utility, options = None):
     minMaxFlag = "max"
 
     def constraints(o):
-        modelComputedConstraints = o["constraints"]
+        modelComputedConstraints = reqConstraints(vtReqSpec, o)
         # possibly implement in DGAL, assuming we have it here
         if "metricSchema" in vtSpec:
             vtMetricBounds = boundConstraints(vtSpec["metricSchema"],o)
@@ -135,26 +151,61 @@ def vtOptimalInstance(vtSpec, vtReqSpec, utility, options = None):
     def obj(o):
         return utility(objectives(o))
 
+    if options is None:
+        options = defaultOptions
     vtOptimal = dgal.optimize(
         model,
         input,
         minMaxFlag,
         obj,
         constraints,
-        # options
-        {"problemType": "mip", "solver":"gurobi_direct","debug": True}
+        options
     )
     return vtOptimal
 
 #-------------------------------------------------------------------------------
 
+# upper bound of the utility of a vtSpec: the utility of its ideal objectives
+# vtSpec["idealObjectives"], i.e., the best value of each objective over the
+# vtSpec (e.g., from the payoff table of mainPreprocessing.computeMinMax).
+# Valid for utilities non-decreasing in each objective in its minMax sense,
+# e.g., weighted sums of normalized objectives; inf without ideal objectives
+def vtUtilityBound(vtSpec, utility):
+    if vtSpec.get("idealObjectives") is None:
+        return float("inf")
+    return utility(vtSpec["idealObjectives"])
+
+# indices of vtSpecs, in decreasing order of their utility bounds
+def vtBoundOrder(bounds):
+    return sorted(range(len(bounds)), key=lambda k: -bounds[k])
+
+#-------------------------------------------------------------------------------
+
 # find optimal vt instance of max utility from a set of vtSpecs
+# options["disjunctive"]: solve a single disjunctive MIP over all vtSpecs
+# (see vtDisjunctiveModel) instead of one MIP per vtSpec
+# The vtSpecs are solved in decreasing order of their utility bound (see
+# vtUtilityBound); those whose bound cannot beat the incumbent are not solved,
+# and the others are solved with the utility of the incumbent as cutoff
 def vtOptimalInstanceFromSet(vtSpecSet, vtReqSpec, utility, options = None):
+    if options is not None and options.get("disjunctive", False):
+        disjunctive = vtDisjunctiveModel(vtSpecSet, vtReqSpec, lambda objs, w: utility(objs), {}, options)
+        vtOptimal = vtOptimalInstanceFromDisjunctiveModel(disjunctive, {}, options)
+        if vtOptimal["status"]["termination_condition"] != "optimal":
+            return None
+        return vtOptimal
+
     # initialization
     maxUtility = -float("inf")
     result = None
+    if options is None:
+        options = defaultOptions
+    bounds = [vtUtilityBound(vtSpec, utility) for vtSpec in vtSpecSet]
 
-    for vtSpec in vtSpecSet:
+    for k in vtBoundOrder(bounds):
+        if bounds[k] <= maxUtility:
+            break
+        vtSpec = vtSpecSet[k]
         # extract AM
         model = vtSpec["model"]
         # extract model input
@@ -175,7 +226,7 @@ def vtOptimalInstanceFromSet(vtSpecSet, vtReqSpec, utility, options = None):
         minMaxFlag = "max"
 
         def constraints(o):
-            modelComputedConstraints = o["constraints"]
+            modelComputedConstraints = reqConstraints(vtReqSpec, o)
             # possibly implement in DGAL, assuming we have it here
             #if "metricSchema" in vtSpec:
             #    vtMetricBounds = boundConstraints(vtSpec["metricSchema"],o)
@@ -205,17 +256,187 @@ def vtOptimalInstanceFromSet(vtSpecSet, vtReqSpec, utility, options = None):
             minMaxFlag,
             obj,
             constraints,
-            # options
-            {"problemType": "mip", "solver":"gurobi_direct","debug": True}
+            options if result is None else dict(options, cutoff=maxUtility)
         )
         # assign to result if an optimal solution with max utility is found
 
         if vtOptimal["status"]["termination_condition"] == "optimal":
             #curUtility = utility(objectives(vtOptimal["solution"]))
-            curUtility = utility(objectives(model(vtOptimal["solution"])))
+            curUtility = utility(objectives(vtOptimal["output"]))
+            if curUtility > maxUtility:
+                maxUtility = curUtility
+                result = vtOptimal
+        elif vtOptimal["status"]["termination_condition"] != "infeasible" and \
+             status["termination_condition"] == "infeasible":
+            status = vtOptimal["status"]
+    # return instance of max utility
+    if result is None:
+        return {"status": status}
+    return result
+#-------------------------------------------------------------------------------
+
+# build a parametric DGAL model for each vtSpec in vtSpecSet, where the
+# utility weights are held as mutable params, so that the AM is traced
+# and the Pyomo model is built only once per vtSpec
+# utility maps (objectives, weights) to a number; weights may be Pyomo params
+# weights: initial weights {obj: value}
+# each parametric model gets its own solver session, so that a persistent
+# solver keeps it loaded and warm starts from its previous solution
+def vtParametricModelSet(vtSpecSet, vtReqSpec, utility, weights, options = None):
+    if options is None:
+        options = defaultOptions
+    parametricSet = []
+
+    for vtSpec in vtSpecSet:
+        # extract AM
+        model = vtSpec["model"]
+        # extract model input
+        input = vtSpec["parametersSchema"]
+        # extract obj function
+        objectives = vtReqSpec["objectives"]["function"]
+        objsSchemaAndBounds = vtReqSpec["objectives"]["schema"]
+
+        # normalized objs, always max utility
+        minMaxFlag = "max"
+
+        def constraints(o):
+            modelComputedConstraints = reqConstraints(vtReqSpec, o)
+            vtMetricBounds = boundConstraints(vtSpec["metricSchema"], o)
+            objs = objectives(o)
+            objsBounds = boundConstraints(objsSchemaAndBounds, objs)
+            constraints = dgal.all([
+                modelComputedConstraints,
+                vtMetricBounds,
+                objsBounds
+            ])
+            return(constraints)
+
+        def obj(o, w):
+            return utility(objectives(o), w)
+
+        parametricModel = dgal.createParametricModel(
+            model,
+            input,
+            minMaxFlag,
+            obj,
+            constraints,
+            weights
+        )
+        parametricSet.append({
+            "model": model,
+            "idealObjectives": vtSpec.get("idealObjectives"),
+            "parametricModel": parametricModel,
+            "session": dgal.solverSession(options["solver"])
+        })
+    return parametricSet
+
+#-------------------------------------------------------------------------------
+
+# find optimal vt instance of max utility for the given weights, from a set of
+# parametric models constructed by vtParametricModelSet; parametric models are
+# pruned by their utility bound, as in vtOptimalInstanceFromSet
+# returns the DGAL result of the instance, or, if there is none, {"status": ...}
+# whose termination condition is "infeasible" only if every solve was infeasible
+# (e.g., also under options["cutoff"]), and otherwise that of the first failed
+# solve (e.g., of a time limit), so that callers can tell the two apart
+def vtOptimalInstanceFromParametricSet(parametricSet, vtReqSpec, utility, weights, options = None):
+    # initialization
+    maxUtility = -float("inf")
+    result = None
+    status = {"solver_status": "ok", "termination_condition": "infeasible"}
+    objectives = vtReqSpec["objectives"]["function"]
+    if options is None:
+        options = defaultOptions
+    bounds = [vtUtilityBound(p, lambda objs: utility(objs, weights)) for p in parametricSet]
+
+    for k in vtBoundOrder(bounds):
+        if bounds[k] <= maxUtility:
+            break
+        p = parametricSet[k]
+        solveOptions = dict(options, session=p["session"])
+        if result is not None:
+            solveOptions["cutoff"] = maxUtility
+        vtOptimal = dgal.optimizeParametric(
+            p["parametricModel"],
+            weights,
+            solveOptions
+        )
+        # assign to result if an optimal solution with max utility is found
+        if vtOptimal["status"]["termination_condition"] == "optimal":
+            curUtility = utility(objectives(vtOptimal["output"]), weights)
             if curUtility > maxUtility:
                 maxUtility = curUtility
                 result = vtOptimal
+        elif vtOptimal["status"]["termination_condition"] != "infeasible" and \
+             status["termination_condition"] == "infeasible":
+            status = vtOptimal["status"]
     # return instance of max utility
+    if result is None:
+        return {"status": status}
     return result
 #-------------------------------------------------------------------------------
+
+# build a single disjunctive DGAL model over all vtSpecs in vtSpecSet, with a
+# binary selector per vtSpec (see dgal.createDisjunctiveModel), so that one
+# solve per weight vector returns the vtSpec of max utility and its instance,
+# however many vtSpecs the set has. The objectives of the selected vtSpec are
+# the shared values of the model, and the utility weights mutable params
+# utility maps (objectives, weights) to a number; weights may be Pyomo params
+# weights: initial weights {obj: value}
+# options["bigM"]: optional big-M of the disjunction, for vtSpecs whose vars
+# are not bounded by their constraints (see dgal.createDisjunctiveModel)
+def vtDisjunctiveModel(vtSpecSet, vtReqSpec, utility, weights, options = None):
+    if options is None:
+        options = defaultOptions
+    objectives = vtReqSpec["objectives"]["function"]
+    objsSchemaAndBounds = vtReqSpec["objectives"]["schema"]
+
+    def vtSpecConstraints(vtSpec):
+        def constraints(o):
+            modelComputedConstraints = reqConstraints(vtReqSpec, o)
+            vtMetricBounds = boundConstraints(vtSpec["metricSchema"], o)
+            objs = objectives(o)
+            objsBounds = boundConstraints(objsSchemaAndBounds, objs)
+            constraints = dgal.all([
+                modelComputedConstraints,
+                vtMetricBounds,
+                objsBounds
+            ])
+            return(constraints)
+        return constraints
+
+    alternatives = [{
+        "model": vtSpec["model"],
+        "input": vtSpec["parametersSchema"],
+        "values": objectives,
+        "constraints": vtSpecConstraints(vtSpec)
+    } for vtSpec in vtSpecSet]
+
+    # normalized objs, always max utility
+    disjunctiveModel = dgal.createDisjunctiveModel(
+        alternatives,
+        "max",
+        utility,
+        weights,
+        options.get("bigM")
+    )
+    return {
+        "models": [vtSpec["model"] for vtSpec in vtSpecSet],
+        "disjunctiveModel": disjunctiveModel,
+        "session": dgal.solverSession(options["solver"])
+    }
+
+#-------------------------------------------------------------------------------
+
+# find optimal vt instance of max utility for the given weights, from a
+# disjunctive model constructed by vtDisjunctiveModel; vtOptimal["alternative"]
+# is the index of the selected vtSpec
+def vtOptimalInstanceFromDisjunctiveModel(disjunctive, weights, options = None):
+    if options is None:
+        options = defaultOptions
+    return dgal.optimizeDisjunctive(
+        disjunctive["disjunctiveModel"],
+        weights,
+        dict(options, session=disjunctive["session"])
+    )
+#-------------------------------------------------------------------------------